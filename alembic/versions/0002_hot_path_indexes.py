@@ -0,0 +1,68 @@
+"""hot path indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+UNIQUE_KEYS = {
+    "likes": ("from_user_id", "to_user_id"),
+    "dislikes": ("from_user_id", "to_user_id"),
+    "matches": ("liking_user_id", "liked_user_id"),
+    "prfoile_view_histories": ("viewing_user_id", "viewed_user_id"),
+    "user_scope_links": ("user_id", "scope_id"),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Перед уникальными индексами удаляем дубли, оставляя самую раннюю запись
+    for table, columns in UNIQUE_KEYS.items():
+        condition = " AND ".join(f"a.{column} = b.{column}" for column in columns)
+        op.execute(f"DELETE FROM {table} a USING {table} b WHERE {condition} AND a.id > b.id")
+
+    op.create_index('ix_cities_region_id_name_ru', 'cities', ['region_id', 'name_ru'], unique=False)
+    op.create_index('uq_dislikes_from_user_id_to_user_id', 'dislikes', ['from_user_id', 'to_user_id'], unique=True)
+    op.create_index('ix_likes_to_user_id', 'likes', ['to_user_id'], unique=False)
+    op.create_index('uq_likes_from_user_id_to_user_id', 'likes', ['from_user_id', 'to_user_id'], unique=True)
+    op.create_index('ix_matches_liked_user_id', 'matches', ['liked_user_id'], unique=False)
+    op.create_index('uq_matches_liking_user_id_liked_user_id', 'matches', ['liking_user_id', 'liked_user_id'], unique=True)
+    op.create_index('ix_prfoile_view_histories_viewed_user_id', 'prfoile_view_histories', ['viewed_user_id'], unique=False)
+    op.create_index('uq_prfoile_view_histories_viewing_user_id_viewed_user_id', 'prfoile_view_histories', ['viewing_user_id', 'viewed_user_id'], unique=True)
+    op.create_index('ix_profiles_test_score', 'profiles', ['test_score'], unique=False, postgresql_include=['user_id'])
+    op.create_index('ix_refresh_tokens_user_id_expires_at', 'refresh_tokens', ['user_id', 'expires_at'], unique=False)
+    op.create_index('ix_regions_country_code_name_ru', 'regions', ['country_code', 'name_ru'], unique=False)
+    op.create_index('uq_user_scope_links_user_id_scope_id', 'user_scope_links', ['user_id', 'scope_id'], unique=True)
+    op.create_index('ix_users_confirmation_token', 'users', ['confirmation_token'], unique=False)
+    op.create_index('ix_users_password_reset_confirmation_token', 'users', ['password_reset_confirmation_token'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_password_reset_confirmation_token', table_name='users')
+    op.drop_index('ix_users_confirmation_token', table_name='users')
+    op.drop_index('uq_user_scope_links_user_id_scope_id', table_name='user_scope_links')
+    op.drop_index('ix_regions_country_code_name_ru', table_name='regions')
+    op.drop_index('ix_refresh_tokens_user_id_expires_at', table_name='refresh_tokens')
+    op.drop_index('ix_profiles_test_score', table_name='profiles')
+    op.drop_index('uq_prfoile_view_histories_viewing_user_id_viewed_user_id', table_name='prfoile_view_histories')
+    op.drop_index('ix_prfoile_view_histories_viewed_user_id', table_name='prfoile_view_histories')
+    op.drop_index('uq_matches_liking_user_id_liked_user_id', table_name='matches')
+    op.drop_index('ix_matches_liked_user_id', table_name='matches')
+    op.drop_index('uq_likes_from_user_id_to_user_id', table_name='likes')
+    op.drop_index('ix_likes_to_user_id', table_name='likes')
+    op.drop_index('uq_dislikes_from_user_id_to_user_id', table_name='dislikes')
+    op.drop_index('ix_cities_region_id_name_ru', table_name='cities')
@@ -0,0 +1,60 @@
+"""like pair index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Встречные лайки, оставшиеся без метча, превращаем в метч
+    op.execute("""
+        INSERT INTO matches (liking_user_id, liked_user_id)
+        SELECT a.from_user_id, a.to_user_id
+        FROM likes a JOIN likes b ON a.from_user_id = b.to_user_id AND a.to_user_id = b.from_user_id
+        WHERE a.id > b.id
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("""
+        DELETE FROM likes a USING likes b
+        WHERE a.from_user_id = b.to_user_id AND a.to_user_id = b.from_user_id
+    """)
+    # Метчи в обе стороны сводим к одному
+    op.execute("""
+        DELETE FROM matches a USING matches b
+        WHERE least(a.liking_user_id, a.liked_user_id) = least(b.liking_user_id, b.liked_user_id)
+          AND greatest(a.liking_user_id, a.liked_user_id) = greatest(b.liking_user_id, b.liked_user_id)
+          AND a.id > b.id
+    """)
+
+    op.drop_index('uq_likes_from_user_id_to_user_id', table_name='likes')
+    op.create_index(
+        'uq_likes_user_pair', 'likes',
+        [sa.text('least(from_user_id, to_user_id)'), sa.text('greatest(from_user_id, to_user_id)')],
+        unique=True
+    )
+    op.create_index(
+        'uq_matches_user_pair', 'matches',
+        [sa.text('least(liking_user_id, liked_user_id)'), sa.text('greatest(liking_user_id, liked_user_id)')],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_matches_user_pair', table_name='matches')
+    op.drop_index('uq_likes_user_pair', table_name='likes')
+    op.create_index('uq_likes_from_user_id_to_user_id', 'likes', ['from_user_id', 'to_user_id'], unique=True)
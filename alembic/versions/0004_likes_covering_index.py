@@ -0,0 +1,30 @@
+"""likes covering index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_likes_to_user_id_id', 'likes', ['to_user_id', 'id'], unique=False, postgresql_include=['from_user_id'])
+    op.drop_index('ix_likes_to_user_id', table_name='likes')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_likes_to_user_id', 'likes', ['to_user_id'], unique=False)
+    op.drop_index('ix_likes_to_user_id_id', table_name='likes')
@@ -0,0 +1,29 @@
+"""seen ids big endian
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # массив id теперь хранится в big-endian (int4send); старые массивы соберутся из истории заново
+    op.execute("UPDATE profiles SET seen_ids = NULL WHERE seen_ids IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE profiles SET seen_ids = NULL WHERE seen_ids IS NOT NULL")
@@ -0,0 +1,41 @@
+"""users cleanup indexes
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('confirmation_sent_at', sa.DateTime(), nullable=True))
+    # ожидающие подтверждения токены отправлены при регистрации
+    op.execute("UPDATE users SET confirmation_sent_at = created_at WHERE confirmation_token IS NOT NULL")
+    op.create_index(
+        'ix_users_confirmation_sent_at', 'users', ['confirmation_sent_at'], unique=False,
+        postgresql_where=sa.text('confirmation_token IS NOT NULL')
+    )
+    op.create_index(
+        'ix_users_password_reset_confirmation_token_expires', 'users',
+        ['password_reset_confirmation_token_expires'], unique=False,
+        postgresql_where=sa.text('password_reset_confirmation_token_expires IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_password_reset_confirmation_token_expires', table_name='users')
+    op.drop_index('ix_users_confirmation_sent_at', table_name='users')
+    op.drop_column('users', 'confirmation_sent_at')
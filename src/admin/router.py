@@ -4,8 +4,8 @@ from starlette import status
 
 from src.admin.service import add_admin_to_db, get_admin_promote_link_service
 from src.auth.dependencies import get_async_session
-from src.auth.service import get_current_user
-from src.auth.utils import send_confirmation_email
+from src.auth.service import get_current_user, require_scope
+from src.metrics import metrics
 
 admin_router = APIRouter()
 
@@ -22,7 +22,13 @@ async def promote_admin(request: Request, session: AsyncSession = Depends(get_as
 
 
 @admin_router.get("/promote-admin-link")
-async def get_promote_admin_token(user=Depends(get_current_user)):
-    return await get_admin_promote_link_service(user["user"])
+async def get_promote_admin_token(
+        user=Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)
+):
+    return await get_admin_promote_link_service(user["user"], session)
 
 
+@admin_router.get("/metrics")
+async def get_metrics(user=Depends(require_scope("admin"))):
+    return metrics.snapshot()
@@ -1,19 +1,21 @@
 from fastapi import HTTPException
-from jose import jwt, JWTError
+from jose import JWTError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from src.admin.utils import generate_admin_promotion_token
-from src.auth.utils import send_confirmation_email
-from src.config import settings
-from src.database.models import Users, Scopes, UserScopeLink
+from src.auth.keys import key_ring
+from src.database.models import Users
+from src.mail.sender import email_sender
+from src.mail.service import enqueue_confirmation_email
+from src.scopes.service import assign_scopes_to_user
 
 
 async def add_admin_to_db(token: str, session: AsyncSession):
     try:
 
-        payload = jwt.decode(token, settings.get_secret_key(), settings.get_algorithm())
+        payload = key_ring.decode(token)
         user_id = int(payload.get("sub"))
         scope = payload.get("scope")
         if scope != "admin":
@@ -35,45 +37,25 @@ async def add_admin_to_db(token: str, session: AsyncSession):
             detail="Пользователь не найден"
         )
 
-    admin_scope = await session.scalar(
-        select(Scopes).where(Scopes.name == "admin")
-    )
-    print(admin_scope.id)
-    if not admin_scope:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Admin scope not found"
-        )
-
-    scopes = await session.scalars(
-        select(UserScopeLink).where(
-            UserScopeLink.user_id == user_id,
-            UserScopeLink.scope_id == admin_scope.id
-        )
-    )
-    print(list(scopes))
-    # if scopes:
-    #     return {
-    #         "message": "Пользователь уже админ"
-    #     }
-
-    link = UserScopeLink(user_id=user_id, scope_id=admin_scope.id)
-    session.add(link)
-    await session.commit()
+    # повторное повышение уже выданный скоуп не дублирует
+    await assign_scopes_to_user(session, ["admin"], user_id)
     return {
         "message": f"User {user.email} promoted to admin"
     }
 
 
-async def get_admin_promote_link_service(user):
+async def get_admin_promote_link_service(user, session: AsyncSession):
     token = generate_admin_promotion_token(user.id)
-    await send_confirmation_email(
+    enqueue_confirmation_email(
+        session,
         user.email,
         token,
         "Стать администратором",
         "Чтобы стать администратором, перейдите по ссылке",
         "/admin/promote-admin"
     )
+    await session.commit()
+    email_sender.notify()
     return {
         "message": "Дальнейшие указания отправлены на почту"
     }
@@ -1,8 +1,6 @@
 from datetime import datetime, timedelta
 
-from jose import jwt
-
-from src.config import settings
+from src.auth.keys import key_ring
 
 
 def generate_admin_promotion_token(user_id: int):
@@ -13,7 +11,7 @@ def generate_admin_promotion_token(user_id: int):
         "scope": "admin",
         "exp": expire
     }
-    token = jwt.encode(payload, settings.get_secret_key(), algorithm=settings.get_algorithm())
+    token = key_ring.sign(payload)
     return token
 
 
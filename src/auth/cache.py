@@ -0,0 +1,53 @@
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from src.config import settings
+
+
+class AuthUser(NamedTuple):
+    # снимок пользователя для зависимостей авторизации вместо ORM-объекта
+    id: int
+    email: str
+    is_confirmed: bool
+
+
+class AuthCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # email -> (момент протухания, пользователь, скоупы)
+        self._entries: OrderedDict[str, tuple[float, AuthUser, tuple[str, ...]]] = OrderedDict()
+        self._emails: dict[int, str] = {}
+
+    def get(self, email: str) -> tuple[AuthUser, list[str]] | None:
+        entry = self._entries.get(email)
+        if entry is None:
+            return None
+        expires_at, user, scopes = entry
+        if expires_at < time.monotonic():
+            self.invalidate(email)
+            return None
+        self._entries.move_to_end(email)
+        return user, list(scopes)
+
+    def put(self, email: str, user: AuthUser, scopes: list[str]):
+        self._entries[email] = (time.monotonic() + self.ttl, user, tuple(scopes))
+        self._entries.move_to_end(email)
+        self._emails[user.id] = email
+        while len(self._entries) > self.max_size:
+            _, (_, evicted, _) = self._entries.popitem(last=False)
+            self._emails.pop(evicted.id, None)
+
+    def invalidate(self, email: str):
+        entry = self._entries.pop(email, None)
+        if entry is not None:
+            self._emails.pop(entry[1].id, None)
+
+    def invalidate_user(self, user_id: int):
+        email = self._emails.get(user_id)
+        if email is not None:
+            self.invalidate(email)
+
+
+auth_cache = AuthCache(settings.get_auth_cache_size(), settings.get_auth_cache_ttl())
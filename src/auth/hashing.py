@@ -0,0 +1,100 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from starlette import status
+
+from src.auth.utils import hash_password, verify_password, get_hash_rounds
+from src.config import settings
+from src.metrics import metrics
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_limit: int, rounds: int = 12):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        # bcrypt отпускает GIL, поэтому потоков достаточно, чтобы не блокировать event loop
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._in_flight = 0
+        self._peak_queue_depth = 0
+        self._completed = 0
+        self._rejected = 0
+        # стоимость задается настройкой, а не замером, чтобы все процессы хэшировали одинаково
+        self.rounds = rounds
+        self.hash_ms: float | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._in_flight - self.workers)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        # только повышаем: хэш дороже текущей стоимости не ослабляем
+        return get_hash_rounds(hashed_password) < self.rounds
+
+    async def measure(self):
+        self.hash_ms = await self._run(self._measure, self.rounds)
+        print(f"bcrypt: стоимость {self.rounds}, {self.hash_ms:.0f} мс на хэш")
+
+    async def calibrate(self, target_ms: float, min_rounds: int, max_rounds: int) -> int:
+        # каждый шаг стоимости удваивает время хэширования: замеряем минимальную
+        # стоимость и подбираем наибольшую, которая укладывается в бюджет.
+        # Результат только подсказка для PASSWORD_HASH_ROUNDS, сам хэшер его не применяет
+        base_ms = await self._run(self._measure, min_rounds)
+        rounds = min_rounds
+        while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+            rounds += 1
+        return rounds
+
+    @staticmethod
+    def _measure(rounds: int) -> float:
+        started = time.perf_counter()
+        hash_password("calibration", rounds)
+        return (time.perf_counter() - started) * 1000
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, func, *args):
+        if self.queue_depth >= self.queue_limit:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервер перегружен, попробуйте позже"
+            )
+        self._in_flight += 1
+        self._peak_queue_depth = max(self._peak_queue_depth, self.queue_depth)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self._peak_queue_depth,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "rounds": self.rounds,
+            "hash_ms": self.hash_ms,
+            # пропускная способность одного потока при текущей стоимости
+            "hashes_per_second_per_core": 1000 / self.hash_ms if self.hash_ms else None
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    settings.get_password_hash_workers(),
+    settings.get_password_hash_queue_limit(),
+    settings.get_password_hash_rounds()
+)
+metrics.register("password_hasher", password_hasher.stats)
@@ -0,0 +1,82 @@
+import os
+from datetime import datetime, timezone
+
+from jose import jwk, jwt, JWTError
+
+from src.config import settings
+
+SIGNING_ALGORITHM = "RS256"
+
+
+class KeyRing:
+    def __init__(self, keys_dir: str | None, active_kid: str | None, legacy_secret: str, legacy_algorithm: str,
+                 accept_legacy_until: datetime | None = None):
+        # kid -> разобранный открытый ключ, чтобы не парсить PEM на каждый запрос
+        self._verifiers = {}
+        self._signing_key = None
+        self.active_kid = None
+        # токены без kid подписаны общим секретом (прежняя схема)
+        self.legacy_algorithm = legacy_algorithm
+        self._legacy_key = jwk.construct(legacy_secret, legacy_algorithm)
+        # после перехода на ключи такие токены принимаются только до этого момента (UTC)
+        if accept_legacy_until is not None and accept_legacy_until.tzinfo is not None:
+            accept_legacy_until = accept_legacy_until.astimezone(timezone.utc).replace(tzinfo=None)
+        self.accept_legacy_until = accept_legacy_until
+
+        if not keys_dir:
+            return
+        private_keys = {}
+        for filename in sorted(os.listdir(keys_dir)):
+            kid, extension = os.path.splitext(filename)
+            if extension != ".pem":
+                continue
+            with open(os.path.join(keys_dir, filename)) as f:
+                key = jwk.construct(f.read(), SIGNING_ALGORITHM)
+            # выведенные из оборота ключи лежат только открытой частью и служат для проверки
+            if not key.is_public():
+                private_keys[kid] = key
+                key = key.public_key()
+            self._verifiers[kid] = key
+
+        if self._verifiers and not private_keys:
+            # иначе токены подписывались бы общим секретом без kid, а decode их отклоняет
+            raise ValueError(f"В {keys_dir} нет закрытого ключа для подписи токенов")
+        if private_keys:
+            self.active_kid = active_kid if active_kid in private_keys else max(private_keys)
+            self._signing_key = private_keys[self.active_kid]
+
+    def sign(self, claims: dict) -> str:
+        if self._signing_key is None:
+            return jwt.encode(claims, self._legacy_key, algorithm=self.legacy_algorithm)
+        return jwt.encode(claims, self._signing_key, algorithm=SIGNING_ALGORITHM, headers={"kid": self.active_kid})
+
+    def decode(self, token: str) -> dict:
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is None:
+            if self._verifiers and not self._accepts_legacy():
+                raise JWTError("Токены без kid больше не принимаются")
+            return jwt.decode(token, self._legacy_key, algorithms=[self.legacy_algorithm])
+        key = self._verifiers.get(kid)
+        if key is None:
+            raise JWTError(f"Неизвестный ключ {kid}")
+        return jwt.decode(token, key, algorithms=[SIGNING_ALGORITHM])
+
+    def _accepts_legacy(self) -> bool:
+        return self.accept_legacy_until is not None and datetime.utcnow() < self.accept_legacy_until
+
+    def jwks(self) -> dict:
+        return {
+            "keys": [
+                {**key.to_dict(), "kid": kid, "alg": SIGNING_ALGORITHM, "use": "sig"}
+                for kid, key in self._verifiers.items()
+            ]
+        }
+
+
+key_ring = KeyRing(
+    settings.get_jwt_keys_dir(),
+    settings.get_jwt_active_kid(),
+    settings.get_secret_key(),
+    settings.get_algorithm(),
+    settings.get_jwt_accept_legacy_until()
+)
@@ -6,26 +6,33 @@ from fastapi.responses import HTMLResponse
 
 
 from src.auth.dependencies import get_async_session
-from src.auth.schemas import UserAdd, UserLogin, FormUserLogin, ResetPasswordRequest, ForgotPasswordRequest
+from src.auth.keys import key_ring
+from src.auth.schemas import UserAdd, UserLogin, FormUserLogin, ResetPasswordRequest, ForgotPasswordRequest, \
+    ResendConfirmationRequest
+from src.ratelimit.limiter import rate_limiter, limit_by_ip
 from src.auth.service import add_user_to_db, login_user_from_db, refresh_access_token_in_db, logout_user_from_db, \
-    confirm_user_email, get_current_user, forgot_password_in_db, reset_password_in_db, reset_all_user_refresh_tokens
+    confirm_user_email, get_current_user, forgot_password_in_db, reset_password_in_db, reset_all_user_refresh_tokens, \
+    resend_confirmation_email_in_db
 
 auth_router = APIRouter()
 
 
-@auth_router.post("/reg")
+# лимиты проверяются до обращения к базе и bcrypt
+@auth_router.post("/reg", dependencies=[Depends(limit_by_ip("reg"))])
 async def reg_user(
         user: UserAdd,
         session: AsyncSession = Depends(get_async_session)
 ):
+    await rate_limiter.check_email("reg", user.email)
     return await add_user_to_db(user, session)
 
 
-@auth_router.post("/login")
+@auth_router.post("/login", dependencies=[Depends(limit_by_ip("login"))])
 async def login_user(
         form_data: OAuth2PasswordRequestForm = Depends(),
         session: AsyncSession = Depends(get_async_session)
 ):
+    await rate_limiter.check_email("login", form_data.username)
     user_data = UserLogin(email=form_data.username, password=form_data.password)
 
     return await login_user_from_db(user_data, session)
@@ -54,6 +61,12 @@ async def get_my_posts(user_id: str = Depends(get_current_user)):
     return {"message": f"Posts for user {user_id}"}
 
 
+@auth_router.get("/jwks")
+async def get_jwks():
+    # открытые ключи для проверки токенов на других узлах
+    return key_ring.jwks()
+
+
 @auth_router.get("/confirm")
 async def confirm_email(
         token: str,
@@ -62,11 +75,21 @@ async def confirm_email(
     return await confirm_user_email(token, session)
 
 
-@auth_router.post("/forgot-password")
+@auth_router.post("/resend-confirmation", dependencies=[Depends(limit_by_ip("resend"))])
+async def resend_confirmation(
+        user_data: ResendConfirmationRequest,
+        session: AsyncSession = Depends(get_async_session)
+):
+    await rate_limiter.check_email("resend", user_data.email)
+    return await resend_confirmation_email_in_db(user_data.email, session)
+
+
+@auth_router.post("/forgot-password", dependencies=[Depends(limit_by_ip("forgot"))])
 async def forgot_password(
         user_data: ForgotPasswordRequest,
         session: AsyncSession = Depends(get_async_session)
 ):
+    await rate_limiter.check_email("forgot", user_data.email)
     return await forgot_password_in_db(user_data.email, session)
 
 
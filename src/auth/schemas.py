@@ -43,6 +43,10 @@ class ForgotPasswordRequest(BaseModel):
     email: EmailStr
 
 
+class ResendConfirmationRequest(BaseModel):
+    email: EmailStr
+
+
 class ResetPasswordRequest(BaseModel):
     token: str
     new_password: str
@@ -1,19 +1,25 @@
 from datetime import datetime, timedelta
 
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic_core import ValidationError
 from select import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import JSONResponse
 
+from src.auth.cache import auth_cache, AuthUser
 from src.auth.dependencies import oauth2_scheme, get_async_session
+from src.auth.hashing import password_hasher
+from src.auth.keys import key_ring
 from src.auth.schemas import UserAdd, UserLogin, ResetPasswordRequest
-from src.auth.utils import hash_password, create_access_token, verify_password, create_confirmation_token, \
-    send_confirmation_email, SECRET_KEY, ALGORITHM
+from src.auth.sessions import session_store
+from src.auth.utils import create_access_token, create_confirmation_token
+from src.auth.versions import token_versions
 from src.config import settings
-from src.database.models import Users, RefreshTokens, Scopes, UserScopeLink
+from src.database.models import Users, Scopes, UserScopeLink
+from src.mail.sender import email_sender
+from src.mail.service import enqueue_confirmation_email
 
-from sqlalchemy import select, delete
+from sqlalchemy import select
 from fastapi import HTTPException, status, Depends
 from sqlalchemy.exc import IntegrityError
 
@@ -21,7 +27,13 @@ from src.scopes.service import assign_scopes_to_user, get_user_scopes
 
 
 def require_scope(required_scope: str):
-    async def checker(user_data=Depends(get_current_user)):
+    # В режиме STATELESS_SCOPES скоупы берутся из подписанного токена,
+    # а из базы (через таблицу версий) только версия токена. Выданные позже скоупы
+    # доступны только с новым токеном: его возвращает создание профиля, в остальных
+    # случаях клиент вызывает /auth/refresh
+    user_dependency = get_token_user if settings.get_stateless_scopes() else get_current_user
+
+    async def checker(user_data=Depends(user_dependency)):
         scopes = user_data["scopes"]
         if required_scope not in scopes:
             raise HTTPException(
@@ -42,13 +54,15 @@ async def add_user_to_db(user_data: UserAdd, session: AsyncSession):
             detail="Пользователь с таким email уже существует"
         )
 
-    user_data.password = hash_password(user_data.password)
+    user_data.password = await password_hasher.hash(user_data.password)
 
     user = Users(**user_data.dict())
 
     email_confirmation_token = create_confirmation_token()
     user.confirmation_token = email_confirmation_token
-    await send_confirmation_email(
+    user.confirmation_sent_at = datetime.utcnow()
+    enqueue_confirmation_email(
+        session,
         user.email,
         email_confirmation_token,
         "Подтверждение email",
@@ -59,6 +73,7 @@ async def add_user_to_db(user_data: UserAdd, session: AsyncSession):
     try:
         await session.commit()
         await session.refresh(user)
+        email_sender.notify()
     except IntegrityError:
         await session.rollback()
         raise HTTPException(
@@ -69,7 +84,9 @@ async def add_user_to_db(user_data: UserAdd, session: AsyncSession):
     await assign_scopes_to_user(session, default_scopes, user.id)
 
     user_scopes = await get_user_scopes(session, user.id)
-    access_token = create_access_token({"sub": user.email}, scopes=user_scopes)
+    access_token = create_access_token(
+        {"sub": user.email, "uid": user.id}, scopes=user_scopes, version=user.token_version
+    )
 
     return {
         "JWT-токен": access_token,
@@ -85,32 +102,28 @@ async def add_user_to_db(user_data: UserAdd, session: AsyncSession):
 async def login_user_from_db(user_data: UserLogin, session: AsyncSession):
 
     user = await session.scalar(select(Users).where(Users.email == user_data.email))
-    if not user or not verify_password(user_data.password, user.password):
+    if not user or not await password_hasher.verify(user_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ошибочные данные!"
         )
+    # хэш со старой стоимостью пересчитываем, пока известен пароль
+    if password_hasher.needs_rehash(user.password):
+        user.password = await password_hasher.hash(user_data.password)
     user_scopes = await session.scalars(
         select(Scopes.name).join(UserScopeLink).where(UserScopeLink.user_id == user.id)
     )
-    access_token = create_access_token({"sub": user.email}, list(user_scopes))
-    existing_refresh_tokens = await session.scalars(
-        select(RefreshTokens).where(RefreshTokens.user_id == user.id)
+    access_token = create_access_token(
+        {"sub": user.email, "uid": user.id}, list(user_scopes), version=user.token_version
     )
-    refresh_tokens_list = list(existing_refresh_tokens)
-    if len(refresh_tokens_list) > 40:
-        tokens_to_delete = sorted(refresh_tokens_list, key=lambda t: t.expires_at)[:len(refresh_tokens_list) - 5]
-        for token in tokens_to_delete:
-            await session.delete(token)
+    if await session_store.is_over_limit(user.id, session):
+        await session_store.evict_oldest(user.id, session)
+        await session.commit()
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Превышено время одновременных сессий!"
         )
-    refresh_token = RefreshTokens(
-        user_id=user.id,
-        expires_at=datetime.utcnow() + timedelta(days=settings.get_refresh_token_expire_days())
-    )
-    session.add(refresh_token)
+    refresh_token = session_store.create(user.id, session)
     await session.commit()
 
     response = JSONResponse(
@@ -132,9 +145,7 @@ async def login_user_from_db(user_data: UserLogin, session: AsyncSession):
 
 
 async def refresh_access_token_in_db(token: str, session: AsyncSession):
-    token = await session.scalar(
-        select(RefreshTokens).where(RefreshTokens.token == token)
-    )
+    token = await session_store.get(token, session)
     if not token or token.expires_at < datetime.utcnow():
         raise HTTPException(status_code=401, detail="Недействительный или истекший refresh токен")
 
@@ -145,14 +156,13 @@ async def refresh_access_token_in_db(token: str, session: AsyncSession):
         raise HTTPException(status_code=404, detail="Пользотватель не найден")
     await session.delete(token)
 
-    new_refresh_token = RefreshTokens(
-        user_id=user.id,
-        expires_at=datetime.utcnow() + timedelta(days=settings.get_refresh_token_expire_days())
-    )
-    session.add(new_refresh_token)
+    new_refresh_token = session_store.create(user.id, session)
     await session.commit()
 
-    new_access_token = create_access_token({"sub": user.email})
+    user_scopes = await get_user_scopes(session, user.id)
+    new_access_token = create_access_token(
+        {"sub": user.email, "uid": user.id}, user_scopes, version=user.token_version
+    )
 
     response = JSONResponse(content={
         "access_token": new_access_token,
@@ -170,21 +180,14 @@ async def refresh_access_token_in_db(token: str, session: AsyncSession):
 
 
 async def logout_user_from_db(token: str, session: AsyncSession):
-    result = await session.execute(
-        select(RefreshTokens).where(RefreshTokens.token == token)
-    )
-
-    token = result.scalar_one_or_none()
-    if not token:
+    if not token or not await session_store.revoke(token, session):
         raise HTTPException(status_code=401, detail="Refresh токен отсутсвует")
-    if token:
-        await session.delete(token)
-        await session.commit()
-        response = JSONResponse(content={
-            "detail": "Вы вышли из системы"
-        })
-        response.delete_cookie("refresh_token")
-        return response
+    await session.commit()
+    response = JSONResponse(content={
+        "detail": "Вы вышли из системы"
+    })
+    response.delete_cookie("refresh_token")
+    return response
 
 
 async def confirm_user_email(token: str, session: AsyncSession):
@@ -197,21 +200,52 @@ async def confirm_user_email(token: str, session: AsyncSession):
     user.is_confirmed = True
     user.confirmation_token = None
     await session.commit()
+    token_versions.invalidate(user.id)
     return {
         "message": "Email успешно подтвержден!"
     }
 
 
+async def resend_confirmation_email_in_db(email: str, session: AsyncSession):
+    # протухшие токены подтверждения очищаются фоновой задачей, взамен выдаем новый
+    user = await session.scalar(select(Users).where(Users.email == email))
+    if user and not user.is_confirmed:
+        email_confirmation_token = create_confirmation_token()
+        user.confirmation_token = email_confirmation_token
+        user.confirmation_sent_at = datetime.utcnow()
+        enqueue_confirmation_email(
+            session,
+            user.email,
+            email_confirmation_token,
+            "Подтверждение email",
+            "Для подтверждения email, пожалуйста, перейдите по ссылке:",
+            "/auth/confirm"
+        )
+        await session.commit()
+        email_sender.notify()
+    return {
+        "message": "Если неподтвержденный пользователь с таким email существует, отправили новое письмо"
+    }
+
+
 async def get_current_user(session: AsyncSession = Depends(get_async_session),
                            token: str = Depends(oauth2_scheme),
                            ):
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = key_ring.decode(token)
         user_id: str = payload.get("sub")
 
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
+        await check_token_version(payload, session)
+        cached = auth_cache.get(user_id)
+        if cached is not None:
+            user, scopes = cached
+            return {
+                "user": user,
+                "scopes": scopes
+            }
         user = await session.scalar(select(Users).where(Users.email == user_id))
         if not user or not user.is_confirmed:
             raise HTTPException(status_code=403, detail="Email не подтвержден")
@@ -221,6 +255,9 @@ async def get_current_user(session: AsyncSession = Depends(get_async_session),
             .where(UserScopeLink.user_id == user.id)
         )
         scopes = [row[0] for row in result.all()]
+        # в кэш попадают только подтвержденные пользователи
+        user = AuthUser(user.id, user.email, user.is_confirmed)
+        auth_cache.put(user_id, user, scopes)
         return {
             "user": user,
             "scopes": scopes
@@ -230,6 +267,55 @@ async def get_current_user(session: AsyncSession = Depends(get_async_session),
         raise HTTPException(status_code=401, detail="Token verification failed")
 
 
+async def check_token_version(payload: dict, session: AsyncSession):
+    # токены с версией отзываются сменой пароля и выходом со всех устройств
+    if payload.get("uid") is None or payload.get("ver") is None:
+        return
+    state = await token_versions.get(payload["uid"], session)
+    if state is None or payload["ver"] != state.version:
+        raise HTTPException(status_code=401, detail="Токен отозван")
+
+
+async def get_token_user(session: AsyncSession = Depends(get_async_session),
+                         token: str = Depends(oauth2_scheme),
+                         ):
+    try:
+        payload = key_ring.decode(token)
+    except JWTError as e:
+        print("JWTError: ", str(e))
+        raise HTTPException(status_code=401, detail="Token verification failed")
+
+    email = payload.get("sub")
+    user_id = payload.get("uid")
+    version = payload.get("ver")
+    if email is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if user_id is None or version is None:
+        # токены, выданные до появления версий, проверяем по базе
+        return await get_current_user(session, token)
+
+    state = await token_versions.get(user_id, session)
+    if state is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not state.is_confirmed:
+        raise HTTPException(status_code=403, detail="Email не подтвержден")
+    if version != state.version:
+        raise HTTPException(status_code=401, detail="Токен отозван")
+    return {
+        "user": AuthUser(user_id, email, state.is_confirmed),
+        "scopes": payload.get("scopes", [])
+    }
+
+
+async def issue_access_token(session: AsyncSession, user_id: int) -> str:
+    # новый access-токен с актуальными скоупами, например после их выдачи
+    user = await session.scalar(select(Users).where(Users.id == user_id))
+    user_scopes = await get_user_scopes(session, user_id)
+    return create_access_token(
+        {"sub": user.email, "uid": user.id}, user_scopes, version=user.token_version
+    )
+
+
 async def forgot_password_in_db(
         email: str,
         session: AsyncSession
@@ -246,15 +332,17 @@ async def forgot_password_in_db(
     user.password_reset_confirmation_token = password_reset_token
     user.password_reset_confirmation_token_expires = datetime.utcnow() + timedelta(hours=1)
 
-    await session.commit()
     print("Отправляю письмо")
-    await send_confirmation_email(
+    enqueue_confirmation_email(
+        session,
         email,
         password_reset_token,
         "Сброс пароля",
         "Для сброса пароля пожалуйста, перейдите по ссылке: ",
         "/auth/reset-password-page"
     )
+    await session.commit()
+    email_sender.notify()
     return {
         "message": "Если пользователь с таким email существует, оптравили письмо с дальнейшими указаниями"
     }
@@ -276,14 +364,15 @@ async def reset_password_in_db(reset_data: ResetPasswordRequest,
             detail="Неверный или просроченный токен сброса пароля"
         )
 
-    user.password = hash_password(reset_data.new_password)
+    user.password = await password_hasher.hash(reset_data.new_password)
     user.password_reset_confirmation_token = None
     user.password_reset_confirmation_token_expires = None
 
-    await session.execute(
-        delete(RefreshTokens).where(RefreshTokens.user_id == user.id)
-    )
+    await session_store.revoke_all(user.id, session)
+    await token_versions.bump(user.id, session)
     await session.commit()
+    auth_cache.invalidate(user.email)
+    token_versions.invalidate(user.id)
 
     return {
         "message": "Пароль успешно изменен"
@@ -291,11 +380,11 @@ async def reset_password_in_db(reset_data: ResetPasswordRequest,
 
 
 async def reset_all_user_refresh_tokens(user, session: AsyncSession):
-    refresh_tokens = await session.scalars(
-        select(RefreshTokens).where(RefreshTokens.user_id == user.id)
-    )
-    await session.delete(refresh_tokens)
+    await session_store.revoke_all(user.id, session)
+    # выданные access-токены тоже перестают приниматься
+    await token_versions.bump(user.id, session)
     await session.commit()
+    token_versions.invalidate(user.id)
     return {
         "message": "Вы вышли со всех устройств"
     }
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database.models import RefreshTokens
+
+
+class SessionStore:
+    # Все запросы идут по индексу (user_id, expires_at) и не загружают
+    # сессии пользователя целиком. Коммит остается за вызывающим кодом
+    def __init__(self, limit: int, keep_on_overflow: int):
+        self.limit = limit
+        self.keep_on_overflow = keep_on_overflow
+
+    async def count(self, user_id: int, session: AsyncSession) -> int:
+        # считаем не дальше limit + 1, этого хватает для проверки лимита
+        sessions = (
+            select(RefreshTokens.token)
+            .where(RefreshTokens.user_id == user_id)
+            .limit(self.limit + 1)
+            .subquery()
+        )
+        return await session.scalar(select(func.count()).select_from(sessions))
+
+    async def is_over_limit(self, user_id: int, session: AsyncSession) -> bool:
+        return await self.count(user_id, session) > self.limit
+
+    async def evict_oldest(self, user_id: int, session: AsyncSession):
+        # оставляем keep_on_overflow самых поздних сессий, остальные удаляем одним запросом
+        await session.execute(
+            delete(RefreshTokens).where(
+                RefreshTokens.token.in_(
+                    select(RefreshTokens.token)
+                    .where(RefreshTokens.user_id == user_id)
+                    .order_by(RefreshTokens.expires_at.desc())
+                    .offset(self.keep_on_overflow)
+                )
+            )
+        )
+
+    def create(self, user_id: int, session: AsyncSession) -> RefreshTokens:
+        refresh_token = RefreshTokens(
+            user_id=user_id,
+            expires_at=datetime.utcnow() + timedelta(days=settings.get_refresh_token_expire_days())
+        )
+        session.add(refresh_token)
+        return refresh_token
+
+    async def get(self, token: str, session: AsyncSession) -> RefreshTokens | None:
+        return await session.scalar(
+            select(RefreshTokens).where(RefreshTokens.token == token)
+        )
+
+    async def revoke(self, token: str, session: AsyncSession) -> bool:
+        revoked = await session.scalar(
+            delete(RefreshTokens)
+            .where(RefreshTokens.token == token)
+            .returning(RefreshTokens.token)
+        )
+        return revoked is not None
+
+    async def revoke_all(self, user_id: int, session: AsyncSession):
+        await session.execute(
+            delete(RefreshTokens).where(RefreshTokens.user_id == user_id)
+        )
+
+
+session_store = SessionStore(settings.get_session_limit(), settings.get_session_keep_on_overflow())
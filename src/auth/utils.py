@@ -4,63 +4,43 @@ from datetime import datetime, timedelta
 
 import bcrypt
 from fastapi import Depends, HTTPException
-from fastapi_mail import MessageSchema, FastMail
-from jose import jwt, JWTError
 
 from src.auth.dependencies import oauth2_scheme
+from src.auth.keys import key_ring
 from src.config import settings
 
-SECRET_KEY = settings.get_secret_key()
-ALGORITHM = settings.get_algorithm()
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.get_access_token_expire_minutes()
 
 
-def hash_password(password: str) -> str:
-    hashed_bytes = bcrypt.hashpw(password.encode(), bcrypt.gensalt(12))
+def hash_password(password: str, rounds: int = 12) -> str:
+    hashed_bytes = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds))
     return hashed_bytes.decode()
 
 
+def get_hash_rounds(hashed_password: str) -> int:
+    # формат bcrypt: $2b$<cost>$<salt+hash>
+    return int(hashed_password.split("$")[2])
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
 
-def create_access_token(data: dict, scopes: list[str] = None):
+def create_access_token(data: dict, scopes: list[str] = None, version: int = 0):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({
         "exp": expire,
-        "scopes": scopes or []
+        "scopes": scopes or [],
+        "ver": version
     })
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return key_ring.sign(to_encode)
 
 
 def create_confirmation_token() -> str:
     return uuid.uuid4().hex
 
 
-async def send_confirmation_email(
-        email: str,
-        token: str,
-        subject: str,
-        body: str,
-        route: str
-):
-
-    URL = settings.get_URL()
-    message = MessageSchema(
-        subject=f"{subject}",
-        recipients=[email],
-        body=f"""
-                 <h3>Добро пожаловать!</h3>
-        <p>{body}</p>
-        <a href="{URL}{route}?token={token}">Подтвердить email</a>
-            """,
-        subtype="html"
-    )
-    fm = FastMail(settings.config_smtp_provider())
-    await fm.send_message(message)
-
-
 def calculate_entropy(password: str) -> float:
     charset = 0
     if any(c.islower() for c in password): charset += 26
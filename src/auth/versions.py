@@ -0,0 +1,58 @@
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database.models import Users
+
+
+class TokenState(NamedTuple):
+    version: int
+    is_confirmed: bool
+
+
+class TokenVersions:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        # TTL ограничивает, сколько другие процессы принимают отозванные токены
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, TokenState]] = OrderedDict()
+
+    async def get(self, user_id: int, session: AsyncSession) -> TokenState | None:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] >= time.monotonic():
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+        row = (await session.execute(
+            select(Users.token_version, Users.is_confirmed).where(Users.id == user_id)
+        )).one_or_none()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+        state = TokenState(row.token_version, row.is_confirmed)
+        self._entries[user_id] = (time.monotonic() + self.ttl, state)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return state
+
+    async def bump(self, user_id: int, session: AsyncSession):
+        await self.bump_many([user_id], session)
+
+    async def bump_many(self, user_ids: list[int], session: AsyncSession):
+        # коммитит вызывающий код, после коммита нужно вызвать invalidate
+        await session.execute(
+            update(Users)
+            .where(Users.id.in_(user_ids))
+            .values(token_version=Users.token_version + 1)
+        )
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+
+token_versions = TokenVersions(settings.get_auth_cache_size(), settings.get_auth_cache_ttl())
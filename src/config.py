@@ -1,4 +1,5 @@
 import os
+from datetime import datetime
 
 import cloudinary
 from fastapi_mail import ConnectionConfig
@@ -23,6 +24,57 @@ class Settings(BaseSettings):
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
     PYTHONPATH: str
+    CANDIDATE_QUEUE_SIZE: int = 50
+    CANDIDATE_QUEUE_LOW_WATERMARK: int = 10
+    CANDIDATE_QUEUE_MAX_USERS: int = 10000
+    SEEN_CACHE_SIZE: int = 10000
+    SCORE_FLUSH_INTERVAL_SECONDS: float = 2.0
+    SCORE_FLUSH_BATCH_SIZE: int = 500
+    SCORE_INDEX_RELOAD_SECONDS: float = 30.0
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL_SECONDS: float = 30.0
+    STATELESS_SCOPES: bool = False
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64
+    PASSWORD_HASH_TARGET_MS: float = 250.0
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_MIN_ROUNDS: int = 12
+    PASSWORD_HASH_MAX_ROUNDS: int = 15
+    JWT_KEYS_DIR: str | None = None
+    JWT_ACTIVE_KID: str | None = None
+    JWT_ACCEPT_LEGACY_UNTIL: datetime | None = None
+    SESSION_LIMIT: int = 40
+    SESSION_KEEP_ON_OVERFLOW: int = 5
+    MAINTENANCE_INTERVAL_SECONDS: float = 3600.0
+    MAINTENANCE_BATCH_SIZE: int = 1000
+    MAINTENANCE_BATCH_PAUSE_SECONDS: float = 0.5
+    CONFIRMATION_TOKEN_TTL_DAYS: int = 7
+    LOCAL_SMTP_HOST: str = "localhost"
+    LOCAL_SMTP_PORT: int = 1025
+    LOCAL_SMTP_FROM: str = "cupidon@example.com"
+    MAIL_POOL_SIZE: int = 2
+    MAIL_BATCH_SIZE: int = 20
+    MAIL_POLL_INTERVAL_SECONDS: float = 5.0
+    MAIL_MAX_ATTEMPTS: int = 5
+    MAIL_RETRY_BASE_SECONDS: float = 30.0
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_WINDOW_SECONDS: float = 60.0
+    RATE_LIMIT_PER_IP: int = 30
+    RATE_LIMIT_PER_EMAIL: int = 5
+    MODERATION_WORKERS: int = 2
+    MODERATION_MAX_PENDING: int = 64
+    MODERATION_TIMEOUT_SECONDS: float = 10.0
+    MODERATION_BATCH_SIZE: int = 16
+    MODERATION_BATCH_WAIT_MS: float = 20.0
+    MODERATION_QUEUE_DEPTH: int = 64
+    MODERATION_BACKEND: str = "keras"
+    MODERATION_MODEL_PATH: str = "ai-models/nsfw_model_int8.tflite"
+    MODERATION_THREADS: int = 2
+    MODERATION_CACHE_SIZE: int = 50000
+    MODERATION_CACHE_RADIUS: int = 3
+    MODERATION_MAX_PIXELS: int = 40_000_000
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env")
     )
@@ -49,6 +101,20 @@ class Settings(BaseSettings):
                 VALIDATE_CERTS=True
             )
             return conf
+        if self.SMTP_PROVIDER == "local":
+            # локальный SMTP без TLS и авторизации, например aiosmtpd
+            conf = ConnectionConfig(
+                MAIL_USERNAME="",
+                MAIL_PASSWORD="",
+                MAIL_FROM=self.LOCAL_SMTP_FROM,
+                MAIL_PORT=self.LOCAL_SMTP_PORT,
+                MAIL_SERVER=self.LOCAL_SMTP_HOST,
+                MAIL_STARTTLS=False,
+                MAIL_SSL_TLS=False,
+                USE_CREDENTIALS=False,
+                VALIDATE_CERTS=False
+            )
+            return conf
 
 
     def get_URL(self):
@@ -67,6 +133,151 @@ class Settings(BaseSettings):
     def get_secret_key(self):
         return f"{self.SECRET_KEY}"
 
+    def get_candidate_queue_size(self):
+        return self.CANDIDATE_QUEUE_SIZE
+
+    def get_candidate_queue_low_watermark(self):
+        return self.CANDIDATE_QUEUE_LOW_WATERMARK
+
+    def get_candidate_queue_max_users(self):
+        return self.CANDIDATE_QUEUE_MAX_USERS
+
+    def get_seen_cache_size(self):
+        return self.SEEN_CACHE_SIZE
+
+    def get_score_flush_interval(self):
+        return self.SCORE_FLUSH_INTERVAL_SECONDS
+
+    def get_score_flush_batch_size(self):
+        return self.SCORE_FLUSH_BATCH_SIZE
+
+    def get_score_index_reload_interval(self):
+        return self.SCORE_INDEX_RELOAD_SECONDS
+
+    def get_auth_cache_size(self):
+        return self.AUTH_CACHE_SIZE
+
+    def get_auth_cache_ttl(self):
+        return self.AUTH_CACHE_TTL_SECONDS
+
+    def get_stateless_scopes(self):
+        return self.STATELESS_SCOPES
+
+    def get_password_hash_workers(self):
+        return self.PASSWORD_HASH_WORKERS
+
+    def get_password_hash_queue_limit(self):
+        return self.PASSWORD_HASH_QUEUE_LIMIT
+
+    def get_password_hash_target_ms(self):
+        return self.PASSWORD_HASH_TARGET_MS
+
+    def get_password_hash_rounds(self):
+        # одна стоимость на все процессы, ниже минимума не опускаемся
+        return max(self.PASSWORD_HASH_ROUNDS, self.PASSWORD_HASH_MIN_ROUNDS)
+
+    def get_password_hash_min_rounds(self):
+        return self.PASSWORD_HASH_MIN_ROUNDS
+
+    def get_password_hash_max_rounds(self):
+        return self.PASSWORD_HASH_MAX_ROUNDS
+
+    def get_jwt_keys_dir(self):
+        return self.JWT_KEYS_DIR
+
+    def get_jwt_active_kid(self):
+        return self.JWT_ACTIVE_KID
+
+    def get_jwt_accept_legacy_until(self):
+        return self.JWT_ACCEPT_LEGACY_UNTIL
+
+    def get_session_limit(self):
+        return self.SESSION_LIMIT
+
+    def get_session_keep_on_overflow(self):
+        return self.SESSION_KEEP_ON_OVERFLOW
+
+    def get_maintenance_interval(self):
+        return self.MAINTENANCE_INTERVAL_SECONDS
+
+    def get_maintenance_batch_size(self):
+        return self.MAINTENANCE_BATCH_SIZE
+
+    def get_maintenance_batch_pause(self):
+        return self.MAINTENANCE_BATCH_PAUSE_SECONDS
+
+    def get_confirmation_token_ttl_days(self):
+        return self.CONFIRMATION_TOKEN_TTL_DAYS
+
+    def get_mail_pool_size(self):
+        return self.MAIL_POOL_SIZE
+
+    def get_mail_batch_size(self):
+        return self.MAIL_BATCH_SIZE
+
+    def get_mail_poll_interval(self):
+        return self.MAIL_POLL_INTERVAL_SECONDS
+
+    def get_mail_max_attempts(self):
+        return self.MAIL_MAX_ATTEMPTS
+
+    def get_mail_retry_base(self):
+        return self.MAIL_RETRY_BASE_SECONDS
+
+    def get_rate_limit_backend(self):
+        return self.RATE_LIMIT_BACKEND
+
+    def get_rate_limit_redis_url(self):
+        return self.RATE_LIMIT_REDIS_URL
+
+    def get_rate_limit_max_keys(self):
+        return self.RATE_LIMIT_MAX_KEYS
+
+    def get_rate_limit_window(self):
+        return self.RATE_LIMIT_WINDOW_SECONDS
+
+    def get_rate_limit_per_ip(self):
+        return self.RATE_LIMIT_PER_IP
+
+    def get_rate_limit_per_email(self):
+        return self.RATE_LIMIT_PER_EMAIL
+
+    def get_moderation_workers(self):
+        return self.MODERATION_WORKERS
+
+    def get_moderation_max_pending(self):
+        return self.MODERATION_MAX_PENDING
+
+    def get_moderation_timeout(self):
+        return self.MODERATION_TIMEOUT_SECONDS
+
+    def get_moderation_batch_size(self):
+        return self.MODERATION_BATCH_SIZE
+
+    def get_moderation_batch_wait_ms(self):
+        return self.MODERATION_BATCH_WAIT_MS
+
+    def get_moderation_queue_depth(self):
+        return self.MODERATION_QUEUE_DEPTH
+
+    def get_moderation_backend(self):
+        return self.MODERATION_BACKEND
+
+    def get_moderation_model_path(self):
+        return self.MODERATION_MODEL_PATH
+
+    def get_moderation_threads(self):
+        return self.MODERATION_THREADS
+
+    def get_moderation_cache_size(self):
+        return self.MODERATION_CACHE_SIZE
+
+    def get_moderation_cache_radius(self):
+        return self.MODERATION_CACHE_RADIUS
+
+    def get_moderation_max_pixels(self):
+        return self.MODERATION_MAX_PIXELS
+
     def get_db_url(self):
         return (f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@"
                 f"{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}")
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime, date
 from enum import Enum
 
-from sqlalchemy import Integer, String, ForeignKey, func, DateTime, UniqueConstraint
+from sqlalchemy import Integer, String, ForeignKey, func, DateTime, UniqueConstraint, LargeBinary, Index, text
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -17,20 +17,42 @@ class GeoBase(AsyncAttrs, DeclarativeBase):
 
 class Users(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_confirmation_token", "confirmation_token"),
+        Index("ix_users_password_reset_confirmation_token", "password_reset_confirmation_token"),
+        # частичные индексы для фоновой очистки: в них только строки с выданным токеном
+        Index(
+            "ix_users_password_reset_confirmation_token_expires",
+            "password_reset_confirmation_token_expires",
+            postgresql_where=text("password_reset_confirmation_token_expires IS NOT NULL")
+        ),
+        Index(
+            "ix_users_confirmation_sent_at",
+            "confirmation_sent_at",
+            postgresql_where=text("confirmation_token IS NOT NULL")
+        ),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     email: Mapped[str] = mapped_column(unique=True)
     password: Mapped[str]
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
     refresh_tokens: Mapped[list["RefreshTokens"]] = relationship(back_populates="user", cascade="all, delete-orphan")
     confirmation_token: Mapped[str] = mapped_column(nullable=True)
+    # когда отправлен текущий токен подтверждения, после повторной отправки он новый
+    confirmation_sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     is_confirmed: Mapped[bool] = mapped_column(default=False)
     password_reset_confirmation_token: Mapped[str] = mapped_column(nullable=True)
     password_reset_confirmation_token_expires: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     scopes: Mapped[list["UserScopeLink"]] = relationship(back_populates="user", cascade="all, delete-orphan")
+    # увеличивается при отзыве прав, выданные ранее токены перестают приниматься
+    token_version: Mapped[int] = mapped_column(default=0, server_default="0")
 
 
 class Profiles(Base):
     __tablename__ = 'profiles'
+    __table_args__ = (
+        Index("ix_profiles_test_score", "test_score", postgresql_include=["user_id"]),
+    )
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), unique=True, primary_key=True)
     name: Mapped[str]
     gender: Mapped[str]
@@ -44,6 +66,7 @@ class Profiles(Base):
     photo_url: Mapped[str] = mapped_column(nullable=True)
     photo_public_id: Mapped[str] = mapped_column(nullable=True)
     test_score: Mapped[float] = mapped_column(nullable=True)
+    seen_ids: Mapped[bytes] = mapped_column(LargeBinary, nullable=True, deferred=True)
 
     @property
     def to_json(self):
@@ -72,6 +95,11 @@ class Profiles(Base):
 
 class RefreshTokens(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_id_expires_at", "user_id", "expires_at"),
+        # для фоновой очистки истекших сессий
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
 
     token: Mapped[str] = mapped_column(
         String,
@@ -97,6 +125,9 @@ class Scopes(Base):
 
 class UserScopeLink(Base):
     __tablename__ = "user_scope_links"
+    __table_args__ = (
+        Index("uq_user_scope_links_user_id_scope_id", "user_id", "scope_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -116,6 +147,9 @@ class Country(GeoBase):
 
 class Region(GeoBase):
     __tablename__ = "regions"
+    __table_args__ = (
+        Index("ix_regions_country_code_name_ru", "country_code", "name_ru"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name_en: Mapped[str]
@@ -127,6 +161,9 @@ class Region(GeoBase):
 
 class City(GeoBase):
     __tablename__ = "cities"
+    __table_args__ = (
+        Index("ix_cities_region_id_name_ru", "region_id", "name_ru"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name_en: Mapped[str]
@@ -138,6 +175,10 @@ class City(GeoBase):
 
 class Like(Base):
     __tablename__ = "likes"
+    __table_args__ = (
+        # "кто меня лайкнул": страница читается из индекса без обращения к таблице
+        Index("ix_likes_to_user_id_id", "to_user_id", "id", postgresql_include=["from_user_id"]),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, nullable=False)
     from_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -155,8 +196,21 @@ class Like(Base):
     )
 
 
+# Один лайк на пару пользователей: встречный лайк упирается в этот индекс,
+# поэтому взаимность определяется одной проверкой уникальности при вставке
+Index(
+    "uq_likes_user_pair",
+    func.least(Like.from_user_id, Like.to_user_id),
+    func.greatest(Like.from_user_id, Like.to_user_id),
+    unique=True
+).ddl_if(dialect="postgresql")
+
+
 class Dislike(Base):
     __tablename__ = "dislikes"
+    __table_args__ = (
+        Index("uq_dislikes_from_user_id_to_user_id", "from_user_id", "to_user_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, nullable=False)
     from_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -176,6 +230,10 @@ class Dislike(Base):
 
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        Index("uq_matches_liking_user_id_liked_user_id", "liking_user_id", "liked_user_id", unique=True),
+        Index("ix_matches_liked_user_id", "liked_user_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, nullable=False)
     liking_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -193,8 +251,53 @@ class Match(Base):
     )
 
 
+Index(
+    "uq_matches_user_pair",
+    func.least(Match.liking_user_id, Match.liked_user_id),
+    func.greatest(Match.liking_user_id, Match.liked_user_id),
+    unique=True
+).ddl_if(dialect="postgresql")
+
+
+class MatchSummary(Base):
+    # Проекция для списка метчей: по строке на каждого участника метча
+    # с копией данных партнера, чтобы страница читалась без join на профили
+    __tablename__ = "match_summaries"
+    __table_args__ = (
+        Index("ix_match_summaries_partner_user_id", "partner_user_id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    match_id: Mapped[int] = mapped_column(ForeignKey("matches.id", ondelete="CASCADE"), primary_key=True)
+    partner_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    partner_name: Mapped[str]
+    partner_photo_url: Mapped[str] = mapped_column(nullable=True)
+    partner_last_active_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    matched_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    @property
+    def to_json(self):
+        return {
+            "match_id": self.match_id,
+            "user_id": self.partner_user_id,
+            "name": self.partner_name,
+            "photo_url": self.partner_photo_url,
+            "last_active_at": self.partner_last_active_at,
+            "matched_at": self.matched_at
+        }
+
+
 class ProfileViewHistory(Base):
     __tablename__ = "prfoile_view_histories"
+    __table_args__ = (
+        Index(
+            "uq_prfoile_view_histories_viewing_user_id_viewed_user_id",
+            "viewing_user_id",
+            "viewed_user_id",
+            unique=True
+        ),
+        Index("ix_prfoile_view_histories_viewed_user_id", "viewed_user_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, nullable=False, autoincrement=True)
     viewed_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -203,4 +306,20 @@ class ProfileViewHistory(Base):
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow())
 
 
+class EmailOutbox(Base):
+    # письма пишутся в той же транзакции, что и изменения, и отправляются в фоне
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
 
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    recipient: Mapped[str]
+    subject: Mapped[str]
+    body: Mapped[str] = mapped_column(String)
+    status: Mapped[str] = mapped_column(default="pending")
+    attempts: Mapped[int] = mapped_column(default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_error: Mapped[str] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
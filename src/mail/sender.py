@@ -0,0 +1,204 @@
+import asyncio
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Callable
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.config import settings
+from src.database.database import async_session
+from src.database.models import EmailOutbox
+from src.metrics import metrics
+
+
+class SmtpPool:
+    def __init__(self, size: int, config_factory: Callable[[], ConnectionConfig]):
+        self.size = size
+        self.config_factory = config_factory
+        # слот - право держать соединение; неудачное подключение возвращает слот
+        # и следующий ожидающий пробует подключиться сам
+        self._slots = asyncio.Semaphore(size)
+        self._idle: list[aiosmtplib.SMTP] = []
+        self._created = 0
+
+    async def acquire(self) -> aiosmtplib.SMTP:
+        await self._slots.acquire()
+        try:
+            if self._idle:
+                smtp = self._idle.pop()
+                if not smtp.is_connected:
+                    try:
+                        await smtp.connect()
+                    except Exception:
+                        smtp.close()
+                        self._created -= 1
+                        raise
+                return smtp
+            smtp = await self._connect()
+            self._created += 1
+            return smtp
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, smtp: aiosmtplib.SMTP, broken: bool = False):
+        if broken:
+            smtp.close()
+            self._created -= 1
+        else:
+            self._idle.append(smtp)
+        self._slots.release()
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        conf = self.config_factory()
+        smtp = aiosmtplib.SMTP(
+            hostname=conf.MAIL_SERVER,
+            port=conf.MAIL_PORT,
+            use_tls=conf.MAIL_SSL_TLS,
+            start_tls=conf.MAIL_STARTTLS,
+            validate_certs=conf.VALIDATE_CERTS,
+            username=conf.MAIL_USERNAME if conf.USE_CREDENTIALS else None,
+            password=conf.MAIL_PASSWORD.get_secret_value() if conf.USE_CREDENTIALS else None,
+            timeout=conf.TIMEOUT
+        )
+        # connect выполняет STARTTLS и авторизацию, дальше соединение переиспользуется
+        await smtp.connect()
+        return smtp
+
+    async def close(self):
+        while self._idle:
+            smtp = self._idle.pop()
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+            self._created -= 1
+
+
+class EmailSender:
+    def __init__(
+            self,
+            session_factory: async_sessionmaker,
+            config_factory: Callable[[], ConnectionConfig],
+            pool_size: int,
+            batch_size: int,
+            poll_interval: float,
+            max_attempts: int,
+            retry_base: float
+    ):
+        self.session_factory = session_factory
+        self.config_factory = config_factory
+        self.pool = SmtpPool(pool_size, config_factory)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._sent = 0
+        self._retried = 0
+        self._failed = 0
+
+    def notify(self):
+        # будит отправщик сразу после коммита, не дожидаясь опроса
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self.send_pending() == self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"Ошибка при отправке писем: {e}")
+
+    async def send_pending(self) -> int:
+        async with self.session_factory() as session:
+            # SKIP LOCKED: несколько процессов разбирают очередь, не мешая друг другу
+            emails = (await session.scalars(
+                select(EmailOutbox)
+                .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= datetime.utcnow())
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not emails:
+                return 0
+
+            conf = self.config_factory()
+            errors = await asyncio.gather(
+                *(self._send(email, conf.MAIL_FROM) for email in emails),
+                return_exceptions=True
+            )
+            for email, error in zip(emails, errors):
+                email.attempts += 1
+                if error is None:
+                    email.status = "sent"
+                    email.sent_at = datetime.utcnow()
+                    email.last_error = None
+                    self._sent += 1
+                elif email.attempts >= self.max_attempts:
+                    email.status = "failed"
+                    email.last_error = str(error)
+                    self._failed += 1
+                else:
+                    email.next_attempt_at = datetime.utcnow() + timedelta(
+                        seconds=self.retry_base * 2 ** (email.attempts - 1)
+                    )
+                    email.last_error = str(error)
+                    self._retried += 1
+            await session.commit()
+            return len(emails)
+
+    async def _send(self, email: EmailOutbox, sender: str):
+        message = EmailMessage()
+        message["From"] = sender
+        message["To"] = email.recipient
+        message["Subject"] = email.subject
+        message.set_content(email.body, subtype="html")
+
+        smtp = await self.pool.acquire()
+        try:
+            await smtp.send_message(message)
+        except Exception:
+            self.pool.release(smtp, broken=True)
+            raise
+        self.pool.release(smtp)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self._sent,
+            "retried": self._retried,
+            "failed": self._failed,
+            "pool_connections": self.pool._created
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.pool.close()
+
+
+email_sender = EmailSender(
+    async_session,
+    settings.config_smtp_provider,
+    settings.get_mail_pool_size(),
+    settings.get_mail_batch_size(),
+    settings.get_mail_poll_interval(),
+    settings.get_mail_max_attempts(),
+    settings.get_mail_retry_base()
+)
+metrics.register("email_sender", email_sender.stats)
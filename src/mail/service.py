@@ -0,0 +1,32 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database.models import EmailOutbox
+
+
+def enqueue_email(session: AsyncSession, recipient: str, subject: str, body: str) -> EmailOutbox:
+    # письмо уйдет после коммита вызывающей транзакции
+    email = EmailOutbox(recipient=recipient, subject=subject, body=body)
+    session.add(email)
+    return email
+
+
+def enqueue_confirmation_email(
+        session: AsyncSession,
+        email: str,
+        token: str,
+        subject: str,
+        body: str,
+        route: str
+) -> EmailOutbox:
+    URL = settings.get_URL()
+    return enqueue_email(
+        session,
+        email,
+        subject,
+        f"""
+                 <h3>Добро пожаловать!</h3>
+        <p>{body}</p>
+        <a href="{URL}{route}?token={token}">Подтвердить email</a>
+            """
+    )
@@ -5,17 +5,24 @@ from contextlib import asynccontextmanager
 import cloudinary.api
 import uvicorn
 from fastapi import FastAPI
-from nsfw_detector import predict
-from tensorflow import keras
 
+from src.auth.hashing import password_hasher
 from src.config import settings
+from src.database.database import async_session
+from src.mail.sender import email_sender
+from src.moderation.backends import KerasBackend, TFLiteBackend
+from src.moderation.service import moderation_service
+from src.maintenance.scheduler import maintenance_scheduler
+from src.profiles.candidates import candidate_queues
+from src.profiles.score_writer import score_writer
+from src.ratelimit.limiter import rate_limiter
 from src.routers import register_routers
+from src.scopes.registry import scope_registry
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    settings.config_cloudinary()
-    # cloudinary.api.delete_resources(resource_type='image')
+def load_keras_model():
+    from nsfw_detector import predict
+    from tensorflow import keras
 
     h5_path = "ai-models/nsfw_model.h5"
     saved_model_path = "ai-models/nsfw_model.h5"
@@ -35,12 +42,49 @@ async def lifespan(app: FastAPI):
         keras_model.save(saved_model_path)
         print("✅ SavedModel готов")
 
-    # 🚀 3. Загружаем модель в FastAPI
-    app.state.nsfw_model = predict.load_model(saved_model_path)
+    # 🚀 3. Загружаем модель
+    return predict.load_model(saved_model_path)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings.config_cloudinary()
+    async with async_session() as session:
+        await scope_registry.load(session)
+    await password_hasher.measure()
+    suggested_rounds = await password_hasher.calibrate(
+        settings.get_password_hash_target_ms(),
+        settings.get_password_hash_min_rounds(),
+        settings.get_password_hash_max_rounds()
+    )
+    if suggested_rounds != password_hasher.rounds:
+        print(f"bcrypt: в бюджет {settings.get_password_hash_target_ms():.0f} мс укладывается "
+              f"стоимость {suggested_rounds}, ее можно задать в PASSWORD_HASH_ROUNDS")
+    # cloudinary.api.delete_resources(resource_type='image')
+
+    if settings.get_moderation_backend() == "tflite":
+        # int8-модель из src/moderation/export.py; с ai_edge_litert или tflite_runtime TensorFlow не загружается
+        moderation_service.start(TFLiteBackend(
+            settings.get_moderation_model_path(),
+            settings.get_moderation_threads()
+        ))
+    else:
+        app.state.nsfw_model = load_keras_model()
+        moderation_service.start(KerasBackend(app.state.nsfw_model))
     # await seed_all()
     # await drop_all_tables()
     # print("База очищена")
+    score_writer.start()
+    maintenance_scheduler.start()
+    email_sender.start()
     yield
+    await email_sender.close()
+    await maintenance_scheduler.close()
+    await candidate_queues.close()
+    await score_writer.close()
+    await rate_limiter.close()
+    password_hasher.close()
+    await moderation_service.close()
 
 
 app = FastAPI(lifespan=lifespan)
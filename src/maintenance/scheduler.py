@@ -0,0 +1,102 @@
+import asyncio
+import zlib
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import select, func
+
+from src.config import settings
+from src.database.database import engine
+from src.maintenance.service import expired_refresh_tokens_batch, stale_confirmation_tokens_batch, \
+    expired_reset_tokens_batch
+from src.metrics import metrics
+
+
+class MaintenanceScheduler:
+    def __init__(self, interval: float, batch_size: int, batch_pause: float):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self._jobs: dict[str, Callable[[int], object]] = {}
+        self._stats: dict[str, dict] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def add_job(self, name: str, batch_statement: Callable[[int], object]):
+        self._jobs[name] = batch_statement
+        self._stats[name] = {
+            "runs": 0,
+            "skipped_locked": 0,
+            "last_run_at": None,
+            "last_purged": 0,
+            "total_purged": 0,
+            "last_error": None
+        }
+
+    def start(self):
+        if self._tasks:
+            return
+        for name in self._jobs:
+            self._tasks.append(asyncio.create_task(self._loop(name)))
+
+    async def _loop(self, name: str):
+        while True:
+            try:
+                await self.run_job(name)
+            except Exception as e:
+                self._stats[name]["last_error"] = str(e)
+                print(f"Ошибка в задаче обслуживания {name}: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_job(self, name: str) -> int | None:
+        batch_statement = self._jobs[name]
+        stats = self._stats[name]
+        # crc32, а не hash(): ключ блокировки должен совпадать во всех процессах
+        lock_key = zlib.crc32(f"maintenance:{name}".encode())
+        async with engine.connect() as conn:
+            locked = await conn.scalar(select(func.pg_try_advisory_lock(lock_key)))
+            await conn.commit()
+            if not locked:
+                stats["skipped_locked"] += 1
+                return None
+            purged = 0
+            try:
+                while True:
+                    result = await conn.execute(batch_statement(self.batch_size))
+                    await conn.commit()
+                    purged += result.rowcount
+                    if result.rowcount < self.batch_size:
+                        break
+                    await asyncio.sleep(self.batch_pause)
+            finally:
+                # блокировка сессионная и переживает возврат соединения в пул,
+                # поэтому снимаем ее и после ошибки
+                await conn.rollback()
+                await conn.scalar(select(func.pg_advisory_unlock(lock_key)))
+                await conn.commit()
+                stats["runs"] += 1
+                stats["last_run_at"] = datetime.utcnow().isoformat()
+                stats["last_purged"] = purged
+                stats["total_purged"] += purged
+        stats["last_error"] = None
+        print(f"Обслуживание {name}: очищено строк {purged}")
+        return purged
+
+    def stats(self) -> dict:
+        return {name: dict(job_stats) for name, job_stats in self._stats.items()}
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+maintenance_scheduler = MaintenanceScheduler(
+    settings.get_maintenance_interval(),
+    settings.get_maintenance_batch_size(),
+    settings.get_maintenance_batch_pause()
+)
+maintenance_scheduler.add_job("expired_refresh_tokens", expired_refresh_tokens_batch)
+maintenance_scheduler.add_job("stale_confirmation_tokens", stale_confirmation_tokens_batch)
+maintenance_scheduler.add_job("expired_reset_tokens", expired_reset_tokens_batch)
+metrics.register("maintenance", maintenance_scheduler.stats)
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete, update
+
+from src.config import settings
+from src.database.models import RefreshTokens, Users
+
+
+# Каждая функция строит запрос для одной пачки: подзапрос с LIMIT
+# ограничивает, сколько строк меняется за одну транзакцию
+
+def expired_refresh_tokens_batch(batch_size: int):
+    return delete(RefreshTokens).where(
+        RefreshTokens.token.in_(
+            select(RefreshTokens.token)
+            .where(RefreshTokens.expires_at < datetime.utcnow())
+            .limit(batch_size)
+        )
+    )
+
+
+def stale_confirmation_tokens_batch(batch_size: int):
+    expired_before = datetime.utcnow() - timedelta(days=settings.get_confirmation_token_ttl_days())
+    return (
+        update(Users)
+        .where(
+            Users.id.in_(
+                select(Users.id)
+                .where(
+                    Users.confirmation_token.is_not(None),
+                    Users.is_confirmed.is_(False),
+                    Users.confirmation_sent_at < expired_before
+                )
+                .limit(batch_size)
+            )
+        )
+        .values(confirmation_token=None)
+    )
+
+
+def expired_reset_tokens_batch(batch_size: int):
+    return (
+        update(Users)
+        .where(
+            Users.id.in_(
+                select(Users.id)
+                .where(Users.password_reset_confirmation_token_expires < datetime.utcnow())
+                .limit(batch_size)
+            )
+        )
+        .values(
+            password_reset_confirmation_token=None,
+            password_reset_confirmation_token_expires=None
+        )
+    )
@@ -0,0 +1,16 @@
+from typing import Callable
+
+
+class MetricsRegistry:
+    def __init__(self):
+        # имя компонента -> функция, возвращающая его текущие показатели
+        self._sources: dict[str, Callable[[], dict]] = {}
+
+    def register(self, name: str, source: Callable[[], dict]):
+        self._sources[name] = source
+
+    def snapshot(self) -> dict:
+        return {name: source() for name, source in self._sources.items()}
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,75 @@
+import numpy as np
+
+# порядок выходов модели nsfw_detector
+CATEGORIES = ["drawings", "hentai", "neutral", "porn", "sexy"]
+DEFAULT_IMAGE_DIM = 224
+
+
+def to_scores(predictions: np.ndarray) -> list[dict[str, float]]:
+    return [
+        {category: float(value) for category, value in zip(CATEGORIES, row)}
+        for row in predictions
+    ]
+
+
+class KerasBackend:
+    # исходная float32-модель, требует TensorFlow целиком
+    def __init__(self, model):
+        self.model = model
+        shape = model.input_shape
+        self.input_size = (shape[2] or DEFAULT_IMAGE_DIM, shape[1] or DEFAULT_IMAGE_DIM)
+
+    def predict(self, images: np.ndarray) -> list[dict[str, float]]:
+        return to_scores(self.model.predict(images, verbose=0))
+
+
+def load_interpreter(model_path: str, threads: int):
+    # ai_edge_litert / tflite_runtime весят в разы меньше TensorFlow, они и нужны на рабочих узлах
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=threads)
+
+
+class TFLiteBackend:
+    # int8-модель из src/moderation/export.py; вызывать только из одного потока
+    def __init__(self, model_path: str, threads: int = 1):
+        self.interpreter = load_interpreter(model_path, threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch = int(self._input["shape"][0])
+        height, width = (int(dim) for dim in self._input["shape"][1:3])
+        self.input_size = (width, height)
+
+    def predict(self, images: np.ndarray) -> list[dict[str, float]]:
+        if len(images) != self._batch:
+            # размер пачки меняется редко, тензоры перевыделяются только тогда
+            self.interpreter.resize_tensor_input(self._input["index"], [len(images), *self._input["shape"][1:]])
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+            self._batch = len(images)
+
+        self.interpreter.set_tensor(self._input["index"], self._quantize(images))
+        self.interpreter.invoke()
+        return to_scores(self._dequantize(self.interpreter.get_tensor(self._output["index"])))
+
+    def _quantize(self, images: np.ndarray) -> np.ndarray:
+        dtype = self._input["dtype"]
+        if dtype == np.float32:
+            return images.astype(np.float32, copy=False)
+        scale, zero_point = self._input["quantization"]
+        info = np.iinfo(dtype)
+        return np.clip(np.round(images / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize(self, output: np.ndarray) -> np.ndarray:
+        if output.dtype == np.float32:
+            return output
+        scale, zero_point = self._output["quantization"]
+        return (output.astype(np.float32) - zero_point) * scale
@@ -0,0 +1,102 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable
+
+import numpy as np
+from fastapi import HTTPException
+from starlette import status
+
+
+class MicroBatcher:
+    def __init__(
+            self,
+            predict_batch: Callable[[np.ndarray], list],
+            executor: Executor,
+            max_batch: int,
+            max_wait_ms: float,
+            max_queue: int
+    ):
+        self.predict_batch = predict_batch
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue[tuple[np.ndarray, asyncio.Future]] = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task | None = None
+        self._batches = 0
+        self._images = 0
+        self._largest_batch = 0
+        self._rejected = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, image: np.ndarray) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((image, future))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Очередь проверки фото переполнена, попробуйте позже"
+            )
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # ждем остальных не дольше max_wait от первого изображения в пачке
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # ответы тех, кто уже не ждет, не считаем
+            batch = [(image, future) for image, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.predict_batch, np.stack([image for image, _ in batch])
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            self._batches += 1
+            self._images += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize(),
+            "batches": self._batches,
+            "images": self._images,
+            "average_batch": self._images / self._batches if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "rejected": self._rejected
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+
+CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def hamming(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+class VerdictCache:
+    # Оценки модели переиспользуются только для тех же пикселей (sha256). Близкие по dHash
+    # фото могут отличаться важными деталями, поэтому по ним ищутся только отклоненные:
+    # повторную загрузку запрещенного фото отклоняем без модели, остальное проверяет модель.
+    #
+    # Multi-index hashing: 64-битный хеш делится на 4 куска по 16 бит. Хеши на расстоянии
+    # не больше 3 совпадают хотя бы в одном куске, поэтому сравниваем только с хешами из
+    # тех же корзин. При radius >= 4 часть близких дубликатов будет пропущена
+    def __init__(self, max_size: int, radius: int):
+        self.max_size = max_size
+        self.radius = radius
+        # дайджест пикселей -> оценки модели, порядок - давность использования
+        self._verdicts: OrderedDict[bytes, dict[str, float]] = OrderedDict()
+        # dHash отклоненного фото -> его оценки
+        self._unsafe: OrderedDict[int, dict[str, float]] = OrderedDict()
+        self._index: list[dict[int, set[int]]] = [{} for _ in range(CHUNKS)]
+        self._hits = 0
+        self._unsafe_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _chunks(image_hash: int):
+        for position in range(CHUNKS):
+            yield position, (image_hash >> (position * CHUNK_BITS)) & CHUNK_MASK
+
+    def get(self, digest: bytes) -> dict[str, float] | None:
+        scores = self._verdicts.get(digest)
+        if scores is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._verdicts.move_to_end(digest)
+        return scores
+
+    def find_unsafe(self, image_hash: int) -> dict[str, float] | None:
+        best, best_distance = None, self.radius + 1
+        if image_hash in self._unsafe:
+            best, best_distance = image_hash, 0
+        else:
+            for position, chunk in self._chunks(image_hash):
+                for candidate in self._index[position].get(chunk, ()):
+                    distance = hamming(image_hash, candidate)
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+        if best is None:
+            return None
+        self._unsafe_hits += 1
+        self._unsafe.move_to_end(best)
+        return self._unsafe[best]
+
+    def put(self, digest: bytes, scores: dict[str, float]):
+        self._verdicts[digest] = scores
+        self._verdicts.move_to_end(digest)
+        while len(self._verdicts) > self.max_size:
+            self._verdicts.popitem(last=False)
+
+    def put_unsafe(self, image_hash: int, scores: dict[str, float]):
+        if image_hash not in self._unsafe:
+            for position, chunk in self._chunks(image_hash):
+                self._index[position].setdefault(chunk, set()).add(image_hash)
+        self._unsafe[image_hash] = scores
+        self._unsafe.move_to_end(image_hash)
+        while len(self._unsafe) > self.max_size:
+            evicted, _ = self._unsafe.popitem(last=False)
+            self._unindex(evicted)
+
+    def _unindex(self, image_hash: int):
+        for position, chunk in self._chunks(image_hash):
+            bucket = self._index[position][chunk]
+            bucket.discard(image_hash)
+            if not bucket:
+                del self._index[position][chunk]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._verdicts),
+            "unsafe_size": len(self._unsafe),
+            "hits": self._hits,
+            "unsafe_hits": self._unsafe_hits,
+            "misses": self._misses
+        }
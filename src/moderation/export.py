@@ -0,0 +1,134 @@
+# Экспорт NSFW-модели в int8 TFLite и проверка, что вердикты не поменялись:
+#   python -m src.moderation.export --model ai-models/nsfw_model.h5 \
+#       --samples dataset/val --output ai-models/nsfw_model_int8.tflite
+# samples - каталог в формате flow_from_directory: подкаталог на каждую категорию
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from src.moderation.backends import CATEGORIES, KerasBackend, TFLiteBackend
+from src.moderation.images import decode_image
+from src.moderation.service import is_safe
+
+
+def load_samples(samples_dir: str, size: tuple[int, int]) -> tuple[np.ndarray, list[str]]:
+    images, labels = [], []
+    for category in CATEGORIES:
+        category_dir = os.path.join(samples_dir, category)
+        if not os.path.isdir(category_dir):
+            continue
+        for filename in sorted(os.listdir(category_dir)):
+            with open(os.path.join(category_dir, filename), "rb") as f:
+                image = decode_image(f, size)
+            if image is not None:
+                images.append(image)
+                labels.append(category)
+    return np.stack(images), labels
+
+
+def export_int8(model, calibration: np.ndarray, output_path: str):
+    import tensorflow as tf
+
+    def representative_dataset():
+        for image in calibration:
+            yield [image[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+
+
+def predict_all(backend, images: np.ndarray, batch_size: int) -> list[dict[str, float]]:
+    scores = []
+    for start in range(0, len(images), batch_size):
+        scores.extend(backend.predict(images[start:start + batch_size]))
+    return scores
+
+
+def parity_report(reference, candidate, images: np.ndarray, labels: list[str], batch_size: int = 16) -> dict:
+    expected = predict_all(reference, images, batch_size)
+    actual = predict_all(candidate, images, batch_size)
+
+    def accuracy(scores):
+        return sum(max(s, key=s.get) == label for s, label in zip(scores, labels)) / len(labels)
+
+    return {
+        "samples": len(labels),
+        "reference_accuracy": accuracy(expected),
+        "candidate_accuracy": accuracy(actual),
+        # главное - совпадение итогового решения пропустить/отклонить фото
+        "verdict_agreement": sum(is_safe(e) == is_safe(a) for e, a in zip(expected, actual)) / len(labels),
+        "max_score_diff": max(abs(e[c] - a[c]) for e, a in zip(expected, actual) for c in CATEGORIES)
+    }
+
+
+def parity_ok(report: dict, min_agreement: float, max_accuracy_drop: float) -> bool:
+    return (
+        report["verdict_agreement"] >= min_agreement and
+        report["reference_accuracy"] - report["candidate_accuracy"] <= max_accuracy_drop
+    )
+
+
+def split_samples(count: int, calibration_size: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    # калибровочные изображения не входят в проверку, иначе она завышает точность
+    order = np.random.default_rng(seed).permutation(count)
+    return order[:calibration_size], order[calibration_size:]
+
+
+def export_checked(reference, images: np.ndarray, labels: list[str], output_path: str, calibration_size: int,
+                   min_agreement: float, max_accuracy_drop: float) -> tuple[dict, bool]:
+    calibration_idx, evaluation_idx = split_samples(len(images), calibration_size)
+    if len(evaluation_idx) == 0:
+        raise ValueError("Все изображения ушли на калибровку, для проверки ничего не осталось")
+
+    # модель пишется во временный файл рядом и заменяет рабочую, только если прошла проверку
+    fd, tmp_path = tempfile.mkstemp(suffix=".tflite", dir=os.path.dirname(os.path.abspath(output_path)))
+    os.close(fd)
+    try:
+        export_int8(reference.model, images[calibration_idx], tmp_path)
+        report = parity_report(
+            reference, TFLiteBackend(tmp_path), images[evaluation_idx], [labels[i] for i in evaluation_idx]
+        )
+        ok = parity_ok(report, min_agreement, max_accuracy_drop)
+        if ok:
+            os.replace(tmp_path, output_path)
+        return report, ok
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Экспорт NSFW-модели в int8 TFLite с проверкой точности")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--samples", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--calibration-size", type=int, default=200)
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    args = parser.parse_args(argv)
+
+    from nsfw_detector import predict
+
+    reference = KerasBackend(predict.load_model(args.model))
+    images, labels = load_samples(args.samples, reference.input_size)
+    report, ok = export_checked(
+        reference, images, labels, args.output, args.calibration_size, args.min_agreement, args.max_accuracy_drop
+    )
+    print(json.dumps(report, indent=2))
+    if not ok:
+        print("Квантованная модель расходится с исходной, рабочий файл не изменен")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
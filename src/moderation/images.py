@@ -0,0 +1,61 @@
+import hashlib
+import io
+from typing import BinaryIO
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from src.config import settings
+
+ImageSource = bytes | bytearray | memoryview | BinaryIO
+# размер известен из заголовка до декодирования: больше этого не разжимаем
+MAX_PIXELS = settings.get_moderation_max_pixels()
+
+
+def _open_rgb(source: ImageSource) -> Image.Image | None:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        with Image.open(source) as image:
+            if image.width * image.height > MAX_PIXELS:
+                return None
+            return image.convert("RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
+
+
+def _to_array(image: Image.Image, size: tuple[int, int]) -> np.ndarray:
+    # то же, что keras load_img + img_to_array / 255, но без файла на диске
+    if image.size != size:
+        image = image.resize(size, Image.NEAREST)
+    array = np.asarray(image, dtype=np.float32)
+    array /= 255
+    return array
+
+
+def dhash(image: Image.Image) -> int:
+    # 64-битный разностный хеш: пересжатие, масштаб и мелкие правки меняют лишь несколько бит
+    pixels = np.asarray(image.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def pixel_digest(image: Image.Image) -> bytes:
+    # точное совпадение пикселей: пересохранение без изменений дает тот же дайджест
+    digest = hashlib.sha256(f"{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.digest()
+
+
+def decode_image(source: ImageSource, size: tuple[int, int]) -> np.ndarray | None:
+    image = _open_rgb(source)
+    if image is None:
+        return None
+    return _to_array(image, size)
+
+
+def decode_image_with_hashes(source: ImageSource, size: tuple[int, int]) -> tuple[np.ndarray, int, bytes] | None:
+    image = _open_rgb(source)
+    if image is None:
+        return None
+    return _to_array(image, size), dhash(image), pixel_digest(image)
@@ -0,0 +1,146 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from fastapi import HTTPException
+from starlette import status
+
+from src.config import settings
+from src.metrics import metrics
+from src.moderation.batcher import MicroBatcher
+from src.moderation.backends import DEFAULT_IMAGE_DIM
+from src.moderation.cache import VerdictCache
+from src.moderation.images import ImageSource, decode_image_with_hashes
+
+
+def is_safe(scores: dict[str, float]) -> bool:
+    return not (
+        scores["porn"] >= 0.2 or
+        scores["hentai"] >= 0.3 or
+        scores["sexy"] >= 0.5
+    )
+
+
+class ModerationService:
+    def __init__(
+            self,
+            workers: int,
+            max_pending: int,
+            timeout: float,
+            max_batch: int,
+            max_wait_ms: float,
+            max_queue: int,
+            cache_size: int,
+            cache_radius: int
+    ):
+        self.timeout = timeout
+        self._backend = None
+        self._input_size = (DEFAULT_IMAGE_DIM, DEFAULT_IMAGE_DIM)
+        # декодирование держит CPU, поэтому идет в своих потоках, а не в event loop
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nsfw")
+        # прямой проход один на всю пачку, отдельный поток не ждет за декодированием
+        self._model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nsfw-model")
+        self._batcher = MicroBatcher(self._predict_batch, self._model_executor, max_batch, max_wait_ms, max_queue)
+        # ограничивает число фото в работе: декодирование плюс ожидание в пачке
+        self._slots = asyncio.Semaphore(max_pending)
+        # оценки уже проверенных фото и хеши отклоненных; трогаем только из event loop
+        self._cache = VerdictCache(cache_size, cache_radius)
+        self._classified = 0
+        self._timed_out = 0
+
+    def start(self, backend):
+        # backend - KerasBackend или TFLiteBackend из src/moderation/backends.py
+        self._backend = backend
+        self._input_size = backend.input_size
+        self._batcher.start()
+
+    async def classify(self, source: ImageSource) -> dict[str, float]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            raise self._busy()
+
+        job = asyncio.create_task(self._classify(source))
+        # поток нельзя прервать, слот освобождается только когда работа действительно закончена
+        job.add_done_callback(lambda _: self._slots.release())
+        try:
+            scores = await asyncio.wait_for(asyncio.shield(job), max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            raise self._busy()
+        self._classified += 1
+        return scores
+
+    async def _classify(self, source: ImageSource) -> dict[str, float]:
+        image, image_hash, digest = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._prepare, source
+        )
+        scores = self._cache.get(digest)
+        if scores is not None:
+            return scores
+        # близкий дубликат может только отклонить фото, безопасный вердикт не наследуется
+        scores = self._cache.find_unsafe(image_hash)
+        if scores is not None:
+            return scores
+        scores = await self._batcher.submit(image)
+        self._cache.put(digest, scores)
+        if not is_safe(scores):
+            self._cache.put_unsafe(image_hash, scores)
+        return scores
+
+    async def check(self, source: ImageSource):
+        scores = await self.classify(source)
+        print(scores)
+        if not is_safe(scores):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Фото содержит неприемлемый контент"
+            )
+
+    def _prepare(self, source: ImageSource) -> tuple[np.ndarray, int, bytes]:
+        prepared = decode_image_with_hashes(source, self._input_size)
+        if prepared is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Не удалось прочитать изображение"
+            )
+        return prepared
+
+    def _predict_batch(self, images: np.ndarray) -> list[dict[str, float]]:
+        return self._backend.predict(images)
+
+    @staticmethod
+    def _busy() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Проверка фото заняла слишком много времени, попробуйте позже"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "classified": self._classified,
+            "timed_out": self._timed_out,
+            "batching": self._batcher.stats(),
+            "cache": self._cache.stats()
+        }
+
+    async def close(self):
+        await self._batcher.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._model_executor.shutdown(wait=False, cancel_futures=True)
+
+
+moderation_service = ModerationService(
+    settings.get_moderation_workers(),
+    settings.get_moderation_max_pending(),
+    settings.get_moderation_timeout(),
+    settings.get_moderation_batch_size(),
+    settings.get_moderation_batch_wait_ms(),
+    settings.get_moderation_queue_depth(),
+    settings.get_moderation_cache_size(),
+    settings.get_moderation_cache_radius()
+)
+metrics.register("moderation", moderation_service.stats)
@@ -0,0 +1,107 @@
+import asyncio
+from collections import deque, OrderedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database.database import async_session
+from src.profiles.score_index import score_index
+from src.profiles.score_writer import score_writer
+from src.profiles.seen import seen_cache
+
+
+class CandidateQueues:
+    def __init__(self, size: int, low_watermark: int, max_users: int):
+        self.size = size
+        self.low_watermark = low_watermark
+        self.max_users = max_users
+        # очереди давно не заходивших пользователей вытесняются
+        self._queues: OrderedDict[int, deque[int]] = OrderedDict()
+        self._refills: dict[int, asyncio.Task] = {}
+        # число идущих пополнений (фоновых и из peek) и id, свайпнутые за это время
+        self._loading: dict[int, int] = {}
+        self._discarded: dict[int, set[int]] = {}
+
+    async def peek(self, user_id: int, session: AsyncSession) -> int | None:
+        queue = self._queues.get(user_id)
+        if not queue:
+            await self.refill(user_id, session)
+            queue = self._queues.get(user_id)
+            if not queue:
+                return None
+        self._queues.move_to_end(user_id)
+        if len(queue) <= self.low_watermark:
+            self.schedule_refill(user_id)
+        return queue[0]
+
+    def discard(self, user_id: int, candidate_id: int):
+        queue = self._queues.get(user_id)
+        if queue:
+            if queue[0] == candidate_id:
+                queue.popleft()
+            elif candidate_id in queue:
+                queue.remove(candidate_id)
+        if user_id in self._loading or user_id in self._refills:
+            self._discarded.setdefault(user_id, set()).add(candidate_id)
+
+    def invalidate(self, user_id: int):
+        self._queues.pop(user_id, None)
+
+    async def refill(self, user_id: int, session: AsyncSession):
+        self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        try:
+            candidates = await self._load_candidates(user_id, session)
+        finally:
+            self._loading[user_id] -= 1
+            if self._loading[user_id]:
+                # свайпы нужны и параллельному пополнению
+                discarded = set(self._discarded.get(user_id, ()))
+            else:
+                del self._loading[user_id]
+                discarded = self._discarded.pop(user_id, set())
+        self._queues[user_id] = deque(c for c in candidates if c not in discarded)
+        self._queues.move_to_end(user_id)
+        while len(self._queues) > self.max_users:
+            self._queues.popitem(last=False)
+
+    def schedule_refill(self, user_id: int):
+        if user_id in self._refills:
+            return
+        self._refills[user_id] = asyncio.create_task(self._background_refill(user_id))
+
+    async def _background_refill(self, user_id: int):
+        try:
+            async with async_session() as session:
+                await self.refill(user_id, session)
+        except Exception as e:
+            print(f"Ошибка при пополнении очереди кандидатов {user_id}: {e}")
+        finally:
+            self._refills.pop(user_id, None)
+            if user_id not in self._loading:
+                self._discarded.pop(user_id, None)
+
+    async def _load_candidates(self, user_id: int, session: AsyncSession) -> list[int]:
+        await score_index.ensure_loaded(session, score_writer.pending())
+        target_score = await score_index.fetch(user_id, session)
+        if target_score is None:
+            return []
+
+        seen = await seen_cache.get(user_id, session)
+        candidates = score_index.nearest(target_score, seen, self.size + 1)
+        return [c for c in candidates if c != user_id][:self.size]
+
+    async def close(self):
+        tasks = list(self._refills.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refills.clear()
+        self._queues.clear()
+        self._discarded.clear()
+
+
+candidate_queues = CandidateQueues(
+    settings.get_candidate_queue_size(),
+    settings.get_candidate_queue_low_watermark(),
+    settings.get_candidate_queue_max_users()
+)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.dependencies import get_async_session
@@ -6,7 +6,8 @@ from src.auth.service import get_current_user, require_scope
 from src.profiles.schemas import FormProfileCreate, FormProfileUpdate
 from src.profiles.service import get_user_profile_from_db, \
     get_profiles_from_db, handle_add_profile, change_user_profile_in_db, like_user_profile_in_db, get_next_profile, \
-    dislike_user_profile_in_db
+    dislike_user_profile_in_db, get_next_profiles, get_liked_me_profiles, \
+    get_matches
 
 profiles_router = APIRouter()
 
@@ -66,6 +67,36 @@ async def next_profile_handle(
     return await get_next_profile(user, session)
 
 
+@profiles_router.get("/next_profiles")
+async def next_profiles_handle(
+        limit: int = Query(20, ge=1, le=100),
+        cursor: str | None = Query(None),
+        user=Depends(require_scope("profile:view")),
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await get_next_profiles(user, session, limit, cursor)
+
+
+@profiles_router.get("/liked_me")
+async def liked_me_handle(
+        limit: int = Query(20, ge=1, le=100),
+        cursor: str | None = Query(None),
+        user=Depends(require_scope("profile:view")),
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await get_liked_me_profiles(user, session, limit, cursor)
+
+
+@profiles_router.get("/matches")
+async def matches_handle(
+        limit: int = Query(20, ge=1, le=100),
+        cursor: str | None = Query(None),
+        user=Depends(require_scope("profile:view")),
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await get_matches(user, session, limit, cursor)
+
+
 @profiles_router.post("/dislike")
 async def dislike_user_profile(
         disliked_user_id: int,
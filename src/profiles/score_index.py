@@ -0,0 +1,123 @@
+import asyncio
+import bisect
+import time
+from typing import Container
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database.models import Profiles
+
+
+class ScoreIndex:
+    def __init__(self, reload_interval: float = 30.0):
+        # (test_score, user_id), отсортировано по возрастанию
+        self._entries: list[tuple[float, int]] = []
+        self._scores: dict[int, float] = {}
+        # оценки меняют и другие процессы, поэтому индекс периодически перечитывается
+        self.reload_interval = reload_interval
+        self._loaded_at: float | None = None
+        self._load_lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.reload_interval
+
+    async def ensure_loaded(self, session: AsyncSession, pending: dict[int, float] | None = None):
+        # pending - еще не записанные в базу приращения этого процесса
+        if self._is_fresh():
+            return
+        async with self._load_lock:
+            if self._is_fresh():
+                return
+            result = await session.execute(
+                select(Profiles.user_id, Profiles.test_score)
+                .where(Profiles.test_score.is_not(None))
+            )
+            scores = {user_id: score for user_id, score in result.all()}
+            for user_id, delta in (pending or {}).items():
+                if user_id in scores:
+                    scores[user_id] = max(0, min(10, scores[user_id] + delta))
+            self._scores = scores
+            self._entries = sorted((score, user_id) for user_id, score in scores.items())
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        # следующий ensure_loaded перечитает индекс
+        self._loaded_at = None
+
+    async def fetch(self, user_id: int, session: AsyncSession) -> float | None:
+        # оценка могла появиться после загрузки индекса
+        score = self._scores.get(user_id)
+        if score is None:
+            score = await session.scalar(select(Profiles.test_score).where(Profiles.user_id == user_id))
+            self.update(user_id, score)
+        return score
+
+    def get(self, user_id: int) -> float | None:
+        return self._scores.get(user_id)
+
+    def update(self, user_id: int, score: float | None):
+        self.remove(user_id)
+        if score is None:
+            return
+        bisect.insort(self._entries, (score, user_id))
+        self._scores[user_id] = score
+
+    def remove(self, user_id: int):
+        score = self._scores.pop(user_id, None)
+        if score is None:
+            return
+        pos = bisect.bisect_left(self._entries, (score, user_id))
+        if pos < len(self._entries) and self._entries[pos] == (score, user_id):
+            del self._entries[pos]
+
+    def nearest(
+            self,
+            target: float,
+            exclude: Container[int],
+            limit: int,
+            after: tuple[float, int] | None = None
+    ) -> list[int]:
+        # Порядок как у ORDER BY abs(test_score - target), user_id:
+        # расходимся от target в обе стороны, профили с одинаковой
+        # дистанцией отдаем по возрастанию user_id.
+        # after — ключ (дистанция, user_id) последнего отданного профиля
+        entries = self._entries
+        middle = bisect.bisect_left(entries, (target,))
+        if after is None:
+            left, right = middle - 1, middle
+        else:
+            left = bisect.bisect_right(entries, -after[0], hi=middle, key=lambda e: -abs(e[0] - target)) - 1
+            right = bisect.bisect_left(entries, after[0], lo=middle, key=lambda e: abs(e[0] - target))
+        result = []
+        while len(result) < limit and (left >= 0 or right < len(entries)):
+            left_distance = abs(entries[left][0] - target) if left >= 0 else None
+            right_distance = abs(entries[right][0] - target) if right < len(entries) else None
+            if right_distance is None or (left_distance is not None and left_distance < right_distance):
+                distance = left_distance
+            else:
+                distance = right_distance
+
+            group = []
+            while left >= 0 and abs(entries[left][0] - target) == distance:
+                group.append(entries[left][1])
+                left -= 1
+            while right < len(entries) and abs(entries[right][0] - target) == distance:
+                group.append(entries[right][1])
+                right += 1
+
+            for user_id in sorted(group):
+                if after is not None and (distance, user_id) <= after:
+                    continue
+                if user_id not in exclude:
+                    result.append(user_id)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+score_index = ScoreIndex(settings.get_score_index_reload_interval())
@@ -0,0 +1,87 @@
+import asyncio
+
+from sqlalchemy import update, values, column, func, Integer, Float
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.config import settings
+from src.database.database import async_session
+from src.database.models import Profiles
+
+
+class ScoreWriter:
+    def __init__(self, session_factory: async_sessionmaker, flush_interval: float, batch_size: int):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # user_id -> сумма еще не записанных изменений оценки. Пишем приращения, а не
+        # значения, чтобы несколько процессов не перетирали изменения друг друга
+        self._pending: dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def pending(self) -> dict[int, float]:
+        return dict(self._pending)
+
+    def record(self, user_id: int, delta: float):
+        self._pending[user_id] = self._pending.get(user_id, 0.0) + delta
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # отмена при остановке не должна оборвать запись посередине
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            items = list(batch.items())
+            try:
+                async with self.session_factory() as session:
+                    for start in range(0, len(items), self.batch_size):
+                        chunk = items[start:start + self.batch_size]
+                        deltas = values(
+                            column("user_id", Integer),
+                            column("delta", Float),
+                            name="deltas"
+                        ).data(chunk)
+                        await session.execute(
+                            update(Profiles)
+                            .where(Profiles.user_id == deltas.c.user_id)
+                            .values(test_score=func.greatest(0, func.least(10, Profiles.test_score + deltas.c.delta)))
+                        )
+                    await session.commit()
+            except Exception as e:
+                print(f"Ошибка при записи оценок профилей: {e}")
+                # все изменения пачки в одной транзакции, поэтому при ошибке возвращаем их целиком
+                for user_id, delta in batch.items():
+                    self._pending[user_id] = self._pending.get(user_id, 0.0) + delta
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+score_writer = ScoreWriter(
+    async_session,
+    settings.get_score_flush_interval(),
+    settings.get_score_flush_batch_size()
+)
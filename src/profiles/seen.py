@@ -0,0 +1,141 @@
+import bisect
+import sys
+from array import array
+from collections import OrderedDict
+
+from sqlalchemy import select, update, func, literal, LargeBinary
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import settings
+from src.database.database import async_session
+from src.database.models import Profiles, ProfileViewHistory
+
+
+def packed_id(user_id):
+    # int4send дает 4 байта big-endian, в том же формате хранится весь массив
+    return func.int4send(user_id)
+
+
+class SeenSet:
+    __slots__ = ("_ids",)
+
+    def __init__(self, ids: array | None = None):
+        # отсортированный массив uint32 без повторов
+        self._ids = ids if ids is not None else array("I")
+
+    @classmethod
+    def from_ids(cls, ids) -> "SeenSet":
+        return cls(array("I", sorted(set(ids))))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SeenSet":
+        # в базе id дописываются в конец по мере свайпов, порядок наводим при чтении
+        ids = array("I")
+        ids.frombytes(data)
+        if sys.byteorder == "little":
+            ids.byteswap()
+        return cls.from_ids(ids)
+
+    def to_bytes(self) -> bytes:
+        if sys.byteorder == "little":
+            ids = array("I", self._ids)
+            ids.byteswap()
+            return ids.tobytes()
+        return self._ids.tobytes()
+
+    def add(self, user_id: int):
+        pos = bisect.bisect_left(self._ids, user_id)
+        if pos == len(self._ids) or self._ids[pos] != user_id:
+            self._ids.insert(pos, user_id)
+
+    def __contains__(self, user_id: int) -> bool:
+        pos = bisect.bisect_left(self._ids, user_id)
+        return pos < len(self._ids) and self._ids[pos] == user_id
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def seen_append_cte(user_id: int, target_user_id: int, history):
+    # id дописывается на стороне базы, поэтому параллельные свайпы не затирают друг друга.
+    # Пока массив не собран (NULL), он так и остается NULL и соберется из истории целиком.
+    # Возвращаем только длину массива в байтах, сам массив по сети не гоняем
+    return (
+        update(Profiles)
+        .where(Profiles.user_id == user_id, select(history.c.id).exists())
+        .values(seen_ids=Profiles.seen_ids.op("||", return_type=LargeBinary)(packed_id(literal(target_user_id))))
+        .returning(func.octet_length(Profiles.seen_ids).label("seen_length"))
+        .cte("seen_update")
+    )
+
+
+class SeenSetCache:
+    def __init__(self, max_size: int, session_factory: async_sessionmaker):
+        self.max_size = max_size
+        self.session_factory = session_factory
+        self._cache: OrderedDict[int, SeenSet] = OrderedDict()
+
+    async def get(self, user_id: int, session: AsyncSession) -> SeenSet:
+        seen = self._cache.get(user_id)
+        if seen is not None:
+            self._cache.move_to_end(user_id)
+            return seen
+
+        data = await session.scalar(
+            select(Profiles.seen_ids).where(Profiles.user_id == user_id)
+        )
+        if data is None:
+            data = await self._build(user_id)
+        seen = SeenSet.from_bytes(data or b"")
+        self.put(user_id, seen)
+        return seen
+
+    async def _build(self, user_id: int) -> bytes | None:
+        # Собираем массив из истории в своей транзакции. Блокировка строки профиля
+        # дожидается свайпов, уже пишущих в нее, а следующие свайпы допишут свой id
+        # к собранному массиву после коммита
+        async with self.session_factory() as session:
+            await session.execute(
+                select(Profiles.user_id).where(Profiles.user_id == user_id).with_for_update()
+            )
+            viewed = (
+                select(func.coalesce(
+                    func.string_agg(packed_id(ProfileViewHistory.viewed_user_id), literal(b"", LargeBinary)),
+                    literal(b"", LargeBinary)
+                ))
+                .where(ProfileViewHistory.viewing_user_id == user_id)
+                .scalar_subquery()
+            )
+            await session.execute(
+                update(Profiles)
+                .where(Profiles.user_id == user_id, Profiles.seen_ids.is_(None))
+                .values(seen_ids=viewed)
+            )
+            data = await session.scalar(
+                select(Profiles.seen_ids).where(Profiles.user_id == user_id)
+            )
+            await session.commit()
+            return data
+
+    def put(self, user_id: int, seen: SeenSet):
+        self._cache[user_id] = seen
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def append(self, user_id: int, target_user_id: int, stored_length: int | None):
+        # stored_length - длина массива в базе после дописывания. Если в кэше на один id
+        # меньше, дописываем только его; иначе свайпы шли мимо кэша и перечитаем массив
+        seen = self._cache.get(user_id)
+        if seen is None:
+            return
+        if stored_length is None or stored_length != (len(seen) + 1) * 4 or target_user_id in seen:
+            self.invalidate(user_id)
+            return
+        seen.add(target_user_id)
+
+    def invalidate(self, user_id: int):
+        self._cache.pop(user_id, None)
+
+
+seen_cache = SeenSetCache(settings.get_seen_cache_size(), async_session)
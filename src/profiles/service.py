@@ -1,12 +1,20 @@
 from datetime import datetime
 
 from fastapi import HTTPException, Request
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, update, delete, exists, func, literal, DateTime
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from src.database.models import Profiles, Country, Region, City, Like, ProfileViewHistory, Dislike, Match
+from src.auth.service import issue_access_token
+from src.database.models import Profiles, Country, Region, City, Like, ProfileViewHistory, Dislike, Match, \
+    MatchSummary
+from src.pagination import encode_cursor, decode_cursor
+from src.profiles.candidates import candidate_queues
 from src.profiles.schemas import AddProfile, FormProfileCreate
+from src.profiles.score_index import score_index
+from src.profiles.score_writer import score_writer
+from src.profiles.seen import seen_cache, seen_append_cte
 from src.profiles.utils import upload_photo_to_cloudinary, delete_photo_from_cloudinary
 from src.scopes.service import assign_scopes_to_user
 
@@ -38,10 +46,15 @@ async def add_user_profile_to_db(data: AddProfile, session: AsyncSession, user_i
     session.add(new_profile)
     await assign_scopes_to_user(session, ['profile:edit', 'profile:like', 'profile:view', 'profile:dislike'], user_id)
     await session.commit()
+    score_index.update(user_id, new_profile.test_score)
+    # в старом токене нет скоупов профиля
+    access_token = await issue_access_token(session, user_id)
     return {
         "message": "Профиль успешно создан",
         "age": new_profile.age,
-        "photo_url": new_profile.photo_url
+        "photo_url": new_profile.photo_url,
+        "access_token": access_token,
+        "token_type": "bearer"
     }
 
 
@@ -70,7 +83,7 @@ async def handle_add_profile(
         )
 
     # 3. Загрузка фото
-    photo = upload_photo_to_cloudinary(form.photo, request)
+    photo = await upload_photo_to_cloudinary(form.photo)
 
     # 4. Добавление профиля
     return await add_user_profile_to_db(data, session, user["user"].id, photo)
@@ -106,11 +119,8 @@ async def validate_user_geo(profile: AddProfile, session: AsyncSession):
 
 
 async def has_been_viewed(viewed_user_id, target_user, session: AsyncSession) -> bool:
-    view_history = await session.scalar(
-        select(ProfileViewHistory).where(ProfileViewHistory.target_user_id == target_user.id)
-        .where(ProfileViewHistory.viewed_id == viewed_user_id)
-    )
-    return view_history is not None
+    seen = await seen_cache.get(target_user.id, session)
+    return viewed_user_id in seen
 
 
 async def get_user_profile_from_db(user_id: int, session: AsyncSession):
@@ -155,10 +165,20 @@ async def change_user_profile_in_db(form, session: AsyncSession, user, request:
     if form.photo:
 
         if user_profile.photo_public_id:
+            # старое фото удаляем только после того, как новое прошло проверку и загрузилось
+            result = await upload_photo_to_cloudinary(form.photo)
             delete_photo_from_cloudinary(user_profile.photo_public_id)
-            result = upload_photo_to_cloudinary(form.photo, request)
             user_profile.photo_url = result["photo_url"]
             user_profile.photo_public_id = result["photo_public_id"]
+    await session.execute(
+        update(MatchSummary)
+        .where(MatchSummary.partner_user_id == user.id)
+        .values(
+            partner_name=user_profile.name,
+            partner_photo_url=user_profile.photo_url,
+            partner_last_active_at=user_profile.last_active_at
+        )
+    )
     await session.commit()
     return {
         "status": 200,
@@ -166,67 +186,130 @@ async def change_user_profile_in_db(form, session: AsyncSession, user, request:
     }
 
 
-async def dislike_user_profile_in_db(
-        disliked_user_id: int,
-        session: AsyncSession,
-        user
-):
-    disliked_user_profile = await session.scalar(
-        select(Profiles).where(Profiles.user_id == disliked_user_id)
+def like_pair_clause(first_user_id: int, second_user_id: int):
+    return (
+        func.least(Like.from_user_id, Like.to_user_id) == min(first_user_id, second_user_id),
+        func.greatest(Like.from_user_id, Like.to_user_id) == max(first_user_id, second_user_id)
+    )
+
+
+def like_pair_index_elements():
+    # выражения uq_likes_user_pair: ON CONFLICT срабатывает только на встречный лайк
+    return [func.least(Like.from_user_id, Like.to_user_id), func.greatest(Like.from_user_id, Like.to_user_id)]
+
+
+def match_pair_index_elements():
+    # выражения uq_matches_user_pair
+    return [
+        func.least(Match.liking_user_id, Match.liked_user_id),
+        func.greatest(Match.liking_user_id, Match.liked_user_id)
+    ]
+
+
+def _swipe_ctes(user_id: int, target_user_id: int, action: str):
+    found = (
+        select(Profiles.user_id, Profiles.name, Profiles.test_score, Profiles.photo_url, Profiles.last_active_at)
+        .where(Profiles.user_id.in_([user_id, target_user_id]))
+        .cte("found")
+    )
+    # история пишется, только если оба профиля существуют; повторный свайп
+    # упирается в уникальный индекс (viewing_user_id, viewed_user_id)
+    history = (
+        insert(ProfileViewHistory)
+        .from_select(
+            ["viewed_user_id", "viewing_user_id", "action", "timestamp"],
+            select(
+                literal(target_user_id),
+                literal(user_id),
+                literal(action),
+                literal(datetime.utcnow(), DateTime)
+            ).where(select(func.count()).select_from(found).scalar_subquery() == 2)
+        )
+        .on_conflict_do_nothing(index_elements=["viewing_user_id", "viewed_user_id"])
+        .returning(ProfileViewHistory.id)
+        .cte("history")
     )
+    return found, history
+
+
+def _swipe_result_columns(found, history, seen_update, user_id: int, target_user_id: int):
+    return [
+        select(found.c.name).where(found.c.user_id == target_user_id).scalar_subquery().label("target_name"),
+        select(found.c.test_score).where(found.c.user_id == target_user_id).scalar_subquery().label("target_score"),
+        select(found.c.test_score).where(found.c.user_id == user_id).scalar_subquery().label("user_score"),
+        exists(select(found.c.user_id).where(found.c.user_id == user_id)).label("user_exists"),
+        exists(select(history.c.id)).label("recorded"),
+        select(seen_update.c.seen_length).scalar_subquery().label("seen_length"),
+    ]
+
 
-    if not disliked_user_profile:
+def _check_swipe_result(row):
+    if row.target_name is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Профиль пользователя, которого лайнкнули, не найден"
         )
-    dislike = await session.scalar(select(Dislike).where(Dislike.from_user_id == user.id and
-                                                         Dislike.to_user_id == disliked_user_id))
-    if dislike:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Такая запись в таблице dislikes существует"
-        )
-    disliking_user_profile = await session.scalar(
-        select(Profiles).where(Profiles.user_id == user.id)
-    )
-    if not disliking_user_profile:
+    if not row.user_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Профиль пользователя, который лайкнул, не найден"
         )
-    if disliking_user_profile.user_id == disliked_user_profile.user_id:
+    if not row.recorded:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Вы уже лайкали/дизлайкали этого пользователя"
+        )
+
+
+async def _check_swipe_allowed(user_id: int, target_user_id: int, session: AsyncSession, self_swipe_detail: str):
+    if user_id == target_user_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Невозможно совершить дизлайк между одними и теми же пользователями"
+            detail=self_swipe_detail
         )
-    view_history = await session.scalars(
-        select(ProfileViewHistory)
-        .where(ProfileViewHistory.viewing_user_id == user.id)
-        .where(ProfileViewHistory.viewed_user_id == disliked_user_profile.user_id)
-    )
-    view_history_list = view_history.all()
-    if view_history_list:
+    # кэш может отставать от базы; окончательно повтор ловит уникальный индекс истории
+    seen = await seen_cache.get(user_id, session)
+    if target_user_id in seen:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Вы уже лайкали/дизлайкали этого пользователя"
         )
-    new_dislike = Dislike(
-        from_user_id=user.id,
-        to_user_id=disliked_user_id
+
+
+async def dislike_user_profile_in_db(
+        disliked_user_id: int,
+        session: AsyncSession,
+        user
+):
+    await _check_swipe_allowed(
+        user.id, disliked_user_id, session,
+        "Невозможно совершить дизлайк между одними и теми же пользователями"
     )
-    session.add(
-        ProfileViewHistory(
-            viewed_user_id=disliked_user_id,
-            viewing_user_id=user.id,
-            action="dislike",
-            timestamp=datetime.utcnow()
+
+    found, history = _swipe_ctes(user.id, disliked_user_id, "dislike")
+    seen_update = seen_append_cte(user.id, disliked_user_id, history)
+    new_dislike = (
+        insert(Dislike)
+        .from_select(
+            ["from_user_id", "to_user_id"],
+            select(literal(user.id), literal(disliked_user_id)).select_from(history)
         )
+        .on_conflict_do_nothing(index_elements=["from_user_id", "to_user_id"])
+        .returning(Dislike.id)
+        .cte("new_dislike")
     )
-    session.add(new_dislike)
+    row = (await session.execute(
+        select(*_swipe_result_columns(found, history, seen_update, user.id, disliked_user_id))
+        .add_cte(new_dislike)
+    )).one()
+    _check_swipe_result(row)
+    await session.commit()
+    # длина из RETURNING учитывает свайпы из других запросов и процессов
+    seen_cache.append(user.id, disliked_user_id, row.seen_length)
+    candidate_queues.discard(user.id, disliked_user_id)
 
-    current_test_score = disliking_user_profile.test_score
-    disliked_test_score = disliked_user_profile.test_score
+    current_test_score = row.user_score
+    disliked_test_score = row.target_score
 
     if current_test_score is not None and disliked_test_score is not None:
         if current_test_score < disliked_test_score:
@@ -237,10 +320,9 @@ async def dislike_user_profile_in_db(
             current_test_score += delta
     # float(current_test_score) = max(0, min(10, current_test_score))
     # disliking_user_profile.test_score = current_test_score
-    await session.commit()
     return {
         "status": 200,
-        "message": f"Вы успешно дизлайкнули пользовтеля {disliked_user_profile.name}",
+        "message": f"Вы успешно дизлайкнули пользовтеля {row.target_name}",
         "new_test_score": current_test_score
     }
 
@@ -250,85 +332,103 @@ async def like_user_profile_in_db(
         session: AsyncSession,
         user
 ):
-    liked_user_profile = await session.scalar(
-        select(Profiles).where(Profiles.user_id == liked_user_id)
+    await _check_swipe_allowed(
+        user.id, liked_user_id, session,
+        "Невозможно совершить лайк между одними и теми же пользователями"
     )
 
-    if not liked_user_profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Профиль пользователя, которого лайнкнули, не найден"
+    found, history = _swipe_ctes(user.id, liked_user_id, "like")
+    seen_update = seen_append_cte(user.id, liked_user_id, history)
+    # На пару пользователей допускается один лайк (uq_likes_user_pair).
+    # История не дает лайкнуть дважды, поэтому конфликт именно по этому индексу значит,
+    # что встречный лайк уже есть. Вставка ждет параллельную транзакцию с
+    # тем же ключом, так что два одновременных лайка не разминутся
+    new_like = (
+        insert(Like)
+        .from_select(
+            ["from_user_id", "to_user_id"],
+            select(literal(user.id), literal(liked_user_id)).select_from(history)
         )
-    like = await session.scalar(select(Like).where(Like.from_user_id == user.id and Like.to_user_id == liked_user_id))
-    if like:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Такая запись в таблице likes существует"
-        )
-    liking_user_profile = await session.scalar(
-        select(Profiles).where(Profiles.user_id == user.id)
+        .on_conflict_do_nothing(index_elements=like_pair_index_elements())
+        .returning(Like.id)
+        .cte("new_like")
     )
-    if not liking_user_profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Профиль пользователя, который лайкнул, не найден"
+    new_match = (
+        insert(Match)
+        .from_select(
+            ["liking_user_id", "liked_user_id"],
+            select(literal(user.id), literal(liked_user_id))
+            .select_from(history)
+            .where(~exists(select(new_like.c.id)))
         )
-    if liking_user_profile.user_id == liked_user_profile.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Невозможно совершить лайк между одними и теми же пользователями"
-        )
-    view_history = await session.scalars(
-        select(ProfileViewHistory)
-        .where(ProfileViewHistory.viewing_user_id == user.id)
-        .where(ProfileViewHistory.viewed_user_id == liked_user_profile.user_id)
+        .on_conflict_do_nothing(index_elements=match_pair_index_elements())
+        .returning(Match.id)
+        .cte("new_match")
     )
-    view_history_list = view_history.all()
-
-    if view_history_list:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Вы уже лайкали/дизлайкали этого пользователя"
+    # каждому участнику метча — строка с данными партнера
+    owner, partner = found.alias("owner"), found.alias("partner")
+    new_summaries = (
+        insert(MatchSummary)
+        .from_select(
+            ["user_id", "match_id", "partner_user_id", "partner_name", "partner_photo_url",
+             "partner_last_active_at"],
+            select(
+                owner.c.user_id,
+                new_match.c.id,
+                partner.c.user_id,
+                partner.c.name,
+                partner.c.photo_url,
+                partner.c.last_active_at
+            )
+            .select_from(new_match)
+            .join(owner, literal(True))
+            .join(partner, partner.c.user_id != owner.c.user_id)
         )
-    new_like = Like(
-        from_user_id=user.id,
-        to_user_id=liked_user_id
+        .returning(MatchSummary.match_id)
+        .cte("new_summaries")
     )
-    session.add(
-        ProfileViewHistory(
-            viewed_user_id=liked_user_id,
-            viewing_user_id=user.id,
-            action="like",
-            timestamp=datetime.utcnow()
+    row = (await session.execute(
+        select(
+            *_swipe_result_columns(found, history, seen_update, user.id, liked_user_id),
+            exists(select(new_match.c.id)).label("matched")
         )
-    )
-    session.add(new_like)
-    current_test_score = liking_user_profile.test_score
-    liked_test_score = liked_user_profile.test_score
-    if current_test_score < liked_test_score:
-        delta = (liked_test_score - current_test_score) / 2
-        current_test_score += delta
-    elif current_test_score > liked_test_score:
-        delta = (current_test_score - liked_test_score) / 2
-        current_test_score -= delta
-
-    liking_user_profile.test_score = current_test_score
-    current_test_score = max(0, min(10, current_test_score))
-    liking_user_profile.test_score = current_test_score
-    if await is_match(liking_user_profile.user_id, session):
-        await create_match(liked_user_id, liking_user_profile.user_id, session)
-        await delete_entries_in_likes(liked_user_id, liking_user_profile.user_id, session)
+        .add_cte(new_summaries)
+    )).one()
+    _check_swipe_result(row)
+    if row.matched:
+        # встречный лайк мог закоммититься после снимка запроса, поэтому
+        # удаляем его отдельным запросом по ключу пары
+        await session.execute(
+            delete(Like).where(*like_pair_clause(user.id, liked_user_id))
+        )
+    await session.commit()
+    seen_cache.append(user.id, liked_user_id, row.seen_length)
+    candidate_queues.discard(user.id, liked_user_id)
+
+    # Оценка лайкнувшего сдвигается к середине между двумя оценками. В базе оценка
+    # отстает на еще не записанные приращения, поэтому считаем от живых значений
+    # индекса, а в профиль пишем фактически примененное приращение
+    user_score = await score_index.fetch(user.id, session)
+    target_score = score_index.get(liked_user_id)
+    if target_score is None:
+        target_score = row.target_score
+    new_test_score = user_score
+    if user_score is not None and target_score is not None:
+        new_test_score = max(0, min(10, user_score + (target_score - user_score) / 2))
+        score_index.update(user.id, new_test_score)
+        score_writer.record(user.id, new_test_score - user_score)
+
+    if row.matched:
         return {
             "status": 200,
-            "message": f"Вы успешно лайкнули пользовтеля {liked_user_profile.name}",
+            "message": f"Вы успешно лайкнули пользовтеля {row.target_name}",
             "info": f"Произошел метч",
-            "new_test_score": current_test_score
+            "new_test_score": new_test_score
         }
-    await session.commit()
     return {
         "status": 200,
-        "message": f"Вы успешно лайкнули пользовтеля {liked_user_profile.name}",
-        "new_test_score": current_test_score
+        "message": f"Вы успешно лайкнули пользовтеля {row.target_name}",
+        "new_test_score": new_test_score
     }
 
 
@@ -336,6 +436,17 @@ async def get_next_profile(
         target_user,
         session: AsyncSession,
 ):
+    while True:
+        candidate_id = await candidate_queues.peek(target_user.id, session)
+        if candidate_id is None:
+            break
+        next_profile = await session.scalar(
+            select(Profiles).where(Profiles.user_id == candidate_id)
+        )
+        if next_profile and next_profile.test_score is not None:
+            return next_profile.to_json
+        candidate_queues.discard(target_user.id, candidate_id)
+
     target_profile = await session.scalar(
         select(Profiles)
         .where(Profiles.user_id == target_user.id)
@@ -345,84 +456,95 @@ async def get_next_profile(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Профиль еще не создан"
         )
-
-    viewed_res = await session.scalars(
-        select(ProfileViewHistory.viewed_user_id).where(ProfileViewHistory.viewing_user_id == target_user.id))
-
-    viewed_ids = set(viewed_res.all())
-
-    excluded_ids = viewed_ids.union({target_user.id})
-
-    next_profile = await session.scalar(
-        select(Profiles)
-        .where(
-            and_(
-                Profiles.user_id.notin_(excluded_ids),
-                Profiles.test_score.is_not(None)
-            )
-        )
-        .order_by(func.abs(Profiles.test_score - target_profile.test_score))
-        .limit(1)
-    )
-
-    if next_profile:
-        await session.commit()
-        return next_profile.to_json
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail="нет доступных профилей"
     )
 
 
-async def is_match(viewing_user_id, session: AsyncSession) -> bool:
-    info = await session.scalar(
-        select(ProfileViewHistory)
-        .where(ProfileViewHistory.viewed_user_id == viewing_user_id)
-
-    )
-    if not info:
-        return False
+async def get_next_profiles(
+        target_user,
+        session: AsyncSession,
+        limit: int,
+        cursor: str | None = None
+):
+    await score_index.ensure_loaded(session, score_writer.pending())
+    if cursor:
+        anchor_score, last_distance, last_user_id = decode_cursor(cursor, (float, float, int))
+        after = (last_distance, last_user_id)
+    else:
+        anchor_score = await score_index.fetch(target_user.id, session)
+        after = None
+    if anchor_score is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Профиль еще не создан"
+        )
 
-    if info.action == "like":
-        return True
-    return False
+    seen = await seen_cache.get(target_user.id, session)
+    candidate_ids = score_index.nearest(anchor_score, seen, limit + 1, after)
+    candidate_ids = [c for c in candidate_ids if c != target_user.id][:limit]
 
+    next_cursor = None
+    if len(candidate_ids) == limit:
+        last_user_id = candidate_ids[-1]
+        last_distance = abs(score_index.get(last_user_id) - anchor_score)
+        next_cursor = encode_cursor([anchor_score, last_distance, last_user_id])
 
-async def create_match(viewed_user_id: int, viewing_user_id: int, session: AsyncSession):
-    match = Match(
-        liking_user_id=viewing_user_id,
-        liked_user_id=viewed_user_id
+    profiles = await session.scalars(
+        select(Profiles).where(Profiles.user_id.in_(candidate_ids))
     )
-    print()
-    if match:
-
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Этот метч уже был"
-        )
-
-    session.add(match)
-    await session.commit()
+    profiles_by_id = {profile.user_id: profile for profile in profiles}
+    return {
+        "profiles": [profiles_by_id[c].to_json for c in candidate_ids if c in profiles_by_id],
+        "next_cursor": next_cursor
+    }
 
 
-async def delete_entries_in_likes(viewed_user_id: int, viewing_user_id: int, session: AsyncSession):
-    viewing_like = await get_likes_entry(viewing_user_id, session)
-    if not viewing_like:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Записи в таблице likes не найдены"
-        )
-    await session.delete(viewing_like)
-    await session.commit()
+async def get_liked_me_profiles(user, session: AsyncSession, limit: int, cursor: str | None):
+    query = (
+        select(Like.id, Profiles)
+        .join(Profiles, Profiles.user_id == Like.from_user_id)
+        .where(Like.to_user_id == user.id)
+        .order_by(Like.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        last_like_id, = decode_cursor(cursor, (int,))
+        query = query.where(Like.id < last_like_id)
+
+    rows = (await session.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].id])
+    return {
+        "profiles": [row.Profiles.to_json for row in rows],
+        "next_cursor": next_cursor
+    }
 
 
-async def get_likes_entry(user_id, session: AsyncSession):
-    likes_entry = await session.scalar(
-        select(Like)
-        .where(Like.from_user_id == user_id)
+async def get_matches(user, session: AsyncSession, limit: int, cursor: str | None):
+    query = (
+        select(MatchSummary)
+        .where(MatchSummary.user_id == user.id)
+        .order_by(MatchSummary.match_id.desc())
+        .limit(limit + 1)
     )
-    return likes_entry
+    if cursor is not None:
+        last_match_id, = decode_cursor(cursor, (int,))
+        query = query.where(MatchSummary.match_id < last_match_id)
+
+    summaries = (await session.scalars(query)).all()
+    next_cursor = None
+    if len(summaries) > limit:
+        summaries = summaries[:limit]
+        next_cursor = encode_cursor([summaries[-1].match_id])
+    return {
+        "matches": [summary.to_json for summary in summaries],
+        "next_cursor": next_cursor
+    }
+
 
 #TODO: разобраться с 397 строчкой
-#TODO: Функция для вывода профилей, которые лайкнули юзера
 
@@ -1,12 +1,12 @@
-import os
-import tempfile
+import asyncio
 import uuid
 
 import cloudinary.uploader
 import pycountry
-from fastapi import UploadFile, HTTPException, Request
+from fastapi import UploadFile, HTTPException
 from starlette import status
-from nsfw_detector import predict
+
+from src.moderation.service import moderation_service
 
 
 def get_valid_regions(country_code: str) -> set[str]:
@@ -21,8 +21,7 @@ ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
 MAX_FILE_SIZE_MB = 5
 
 
-def upload_photo_to_cloudinary(photo: UploadFile, request: Request) -> dict:
-    nsfw_model = request.app.state.nsfw_model
+async def upload_photo_to_cloudinary(photo: UploadFile) -> dict:
     if photo.content_type not in ALLOWED_IMAGE_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -37,15 +36,14 @@ def upload_photo_to_cloudinary(photo: UploadFile, request: Request) -> dict:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Файл слишком большой (макс. 5МВ)"
         )
-    if not is_image_safe(photo, nsfw_model):
-        raise HTTPException(
-            status_code=status. HTTP_400_BAD_REQUEST,
-            detail="Фото содержит неприемлемый контент"
-        )
+    # модель читает изображение прямо из буфера загрузки, без копии на диск
+    await moderation_service.check(photo.file)
 
     unique_filename = str(uuid.uuid4())
     photo.file.seek(0)
-    result = cloudinary.uploader.upload(
+    # загрузка в cloudinary тоже блокирующая, выносим ее из event loop
+    result = await asyncio.to_thread(
+        cloudinary.uploader.upload,
         photo.file,
         public_id=unique_filename,
         folder="user_photos",
@@ -57,23 +55,6 @@ def upload_photo_to_cloudinary(photo: UploadFile, request: Request) -> dict:
     }
 
 
-def is_image_safe(photo: UploadFile, model) -> bool:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-        tmp.write(photo.file.read())
-        tmp_path = tmp.name
-
-    result = predict.classify(model, tmp_path)
-    os.remove(tmp_path)
-
-    scores = result[tmp_path]
-    print(scores)
-    return not (
-        scores["porn"] >= 0.2 or
-        scores["hentai"] >= 0.3 or
-        scores["sexy"] >= 0.5
-    )
-
-
 def delete_photo_from_cloudinary(public_id: str):
     print("delete_photo_from_cloudinary")
     try:
@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+
+
+def weighted_count(previous: int, current: int, elapsed: float, window: float) -> float:
+    # скользящее окно: предыдущее окно учитывается пропорционально непрошедшей части
+    return previous * (1 - elapsed / window) + current
+
+
+class MemoryBackend:
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # ключ -> [номер окна, запросов в текущем окне, запросов в предыдущем]
+        self._windows: OrderedDict[str, list[int]] = OrderedDict()
+
+    async def hit(self, key: str, window: float) -> tuple[float, float]:
+        # внутри нет await, поэтому в event loop обновление атомарно и без блокировок
+        now = time.time()
+        index, elapsed = divmod(now, window)
+        index = int(index)
+        entry = self._windows.get(key)
+        if entry is None:
+            entry = self._windows[key] = [index, 0, 0]
+        elif entry[0] != index:
+            previous = entry[1] if entry[0] == index - 1 else 0
+            entry[:] = [index, 0, previous]
+        entry[1] += 1
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_keys:
+            self._windows.popitem(last=False)
+        return weighted_count(entry[2], entry[1], elapsed, window), window - elapsed
+
+    async def close(self):
+        self._windows.clear()
+
+
+class RedisBackend:
+    # общий счетчик для нескольких процессов, подходит любой сервер с протоколом Redis
+    def __init__(self, client, prefix: str = "ratelimit"):
+        self.client = client
+        self.prefix = prefix
+
+    async def hit(self, key: str, window: float) -> tuple[float, float]:
+        now = time.time()
+        index, elapsed = divmod(now, window)
+        index = int(index)
+        current_key = f"{self.prefix}:{key}:{index}"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(current_key)
+            pipe.expire(current_key, int(window * 2) + 1)
+            pipe.get(f"{self.prefix}:{key}:{index - 1}")
+            current, _, previous = await pipe.execute()
+        return weighted_count(int(previous or 0), int(current), elapsed, window), window - elapsed
+
+    async def close(self):
+        await self.client.aclose()
@@ -0,0 +1,53 @@
+import math
+
+from fastapi import HTTPException, Request
+from starlette import status
+
+from src.config import settings
+from src.metrics import metrics
+from src.ratelimit.backends import MemoryBackend, RedisBackend
+
+
+class RateLimiter:
+    def __init__(self, backend, window: float):
+        self.backend = backend
+        self.window = window
+        self._rejected = 0
+
+    async def check(self, scope: str, key: str, limit: int):
+        count, retry_after = await self.backend.hit(f"{scope}:{key}", self.window)
+        if count > limit:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Слишком много запросов, попробуйте позже",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    async def check_email(self, scope: str, email: str):
+        await self.check(f"{scope}:email", email.strip().lower(), settings.get_rate_limit_per_email())
+
+    def stats(self) -> dict:
+        return {"rejected": self._rejected}
+
+    async def close(self):
+        await self.backend.close()
+
+
+def create_backend():
+    if settings.get_rate_limit_backend() == "redis":
+        # redis нужен только для общего лимита между процессами
+        from redis.asyncio import Redis
+        return RedisBackend(Redis.from_url(settings.get_rate_limit_redis_url()))
+    return MemoryBackend(settings.get_rate_limit_max_keys())
+
+
+rate_limiter = RateLimiter(create_backend(), settings.get_rate_limit_window())
+metrics.register("rate_limiter", rate_limiter.stats)
+
+
+def limit_by_ip(scope: str):
+    async def dependency(request: Request):
+        host = request.client.host if request.client else "unknown"
+        await rate_limiter.check(f"{scope}:ip", host, settings.get_rate_limit_per_ip())
+    return dependency
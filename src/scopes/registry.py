@@ -0,0 +1,40 @@
+import asyncio
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from src.database.models import Scopes
+
+
+class ScopeRegistry:
+    def __init__(self):
+        # имя скоупа -> id; скоупов немного и меняются они редко
+        self._ids: dict[str, int] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    async def load(self, session: AsyncSession):
+        async with self._load_lock:
+            result = await session.execute(select(Scopes.name, Scopes.id))
+            self._ids = {name: scope_id for name, scope_id in result.all()}
+            self._loaded = True
+
+    async def resolve(self, names: list[str], session: AsyncSession) -> list[int]:
+        if not self._loaded or any(name not in self._ids for name in names):
+            # скоуп мог появиться в другом процессе
+            await self.load(session)
+        for name in names:
+            if name not in self._ids:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Скоуп {name} не найден"
+                )
+        return [self._ids[name] for name in names]
+
+    def add(self, name: str, scope_id: int):
+        self._ids[name] = scope_id
+
+
+scope_registry = ScopeRegistry()
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.dependencies import get_async_session
+from src.auth.service import require_scope
+from src.scopes.schemas import ScopeCreate, ScopeBulkChange
+from src.scopes.service import create_scope, grant_scope_to_users, revoke_scope_from_users
+
+scopes_router = APIRouter()
+
+
+@scopes_router.post("/create")
+async def create_new_scope(
+        data: ScopeCreate,
+        user=Depends(require_scope("admin")),
+        session: AsyncSession = Depends(get_async_session)
+):
+    return await create_scope(session, data.name, data.description)
+
+
+@scopes_router.post("/grant")
+async def grant_scope(
+        data: ScopeBulkChange,
+        user=Depends(require_scope("admin")),
+        session: AsyncSession = Depends(get_async_session)
+):
+    return await grant_scope_to_users(session, data.scope_name, data.user_ids)
+
+
+@scopes_router.post("/revoke")
+async def revoke_scope(
+        data: ScopeBulkChange,
+        user=Depends(require_scope("admin")),
+        session: AsyncSession = Depends(get_async_session)
+):
+    return await revoke_scope_from_users(session, data.scope_name, data.user_ids)
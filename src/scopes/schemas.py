@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ScopeCreate(BaseModel):
@@ -9,3 +9,7 @@ class ScopeCreate(BaseModel):
 class ScopeAssign(BaseModel):
     scope_name: str
 
+
+class ScopeBulkChange(BaseModel):
+    scope_name: str
+    user_ids: list[int] = Field(min_length=1, max_length=10000)
@@ -1,9 +1,13 @@
 from fastapi import HTTPException
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, literal
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from src.database.models import Scopes, UserScopeLink
+from src.auth.cache import auth_cache
+from src.auth.versions import token_versions
+from src.database.models import Scopes, UserScopeLink, Users
+from src.scopes.registry import scope_registry
 
 
 async def create_scope(session: AsyncSession, name: str, desc: str):
@@ -18,52 +22,74 @@ async def create_scope(session: AsyncSession, name: str, desc: str):
     new_scope = Scopes(name=name, description=desc)
     session.add(new_scope)
     await session.commit()
+    scope_registry.add(name, new_scope.id)
     return {
         "message": f"Скоуп {name} добавлен"
     }
 
 
 async def assign_scopes_to_user(session: AsyncSession, scopes_names: list[str], user_id: int):
-    for scope_name in scopes_names:
-        print(f"Назначаю скоуп {scope_name} пользователю {user_id}")
-        scope = await session.scalar(
-            select(Scopes).where(Scopes.name == scope_name)
-        )
-        if not scope:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Скоуп {scope_name} не найден"
-            )
-        existing_link = await session.scalar(
-            select(UserScopeLink).where(
-                UserScopeLink.user_id == user_id,
-                UserScopeLink.scope_id == scope.id
-            )
-        )
-        if existing_link:
-            return {
-                "message": f"Скоуп {scope_name} уже назначен"
-            }
-        link = UserScopeLink(user_id=user_id, scope_id=scope.id)
-        session.add(link)
-
+    if not scopes_names:
+        # пустой многострочный INSERT не собирается
+        return
+    scope_ids = await scope_registry.resolve(scopes_names, session)
+    # уже назначенные скоупы пропускаются уникальным индексом
+    await session.execute(
+        insert(UserScopeLink)
+        .values([{"user_id": user_id, "scope_id": scope_id} for scope_id in scope_ids])
+        .on_conflict_do_nothing(index_elements=["user_id", "scope_id"])
+    )
     await session.commit()
+    auth_cache.invalidate_user(user_id)
 
 
 async def remove_scopes_from_user(session: AsyncSession, user_id: int, scopes_names: list[str]):
-    for scope_name in scopes_names:
-        scope = await session.scalar(select(Scopes).where(Scopes.name == scope_name))
-        if not scope:
-            raise HTTPException(status_code=404, detail="Скоуп не найден")
+    scope_ids = await scope_registry.resolve(scopes_names, session)
+    await session.execute(
+        delete(UserScopeLink).where(
+            UserScopeLink.user_id == user_id,
+            UserScopeLink.scope_id.in_(scope_ids)
+        )
+    )
+    # токены со снятым скоупом перестают приниматься
+    await token_versions.bump(user_id, session)
+    await session.commit()
+    auth_cache.invalidate_user(user_id)
+    token_versions.invalidate(user_id)
+    return {"message": f"Скоупы {', '.join(scopes_names)} удалены у пользователя {user_id}"}
 
-        await session.execute(
-            delete(UserScopeLink).where(
-                UserScopeLink.user_id == user_id,
-                UserScopeLink.scope_id == scope.id
-            )
+
+async def grant_scope_to_users(session: AsyncSession, scope_name: str, user_ids: list[int]):
+    [scope_id] = await scope_registry.resolve([scope_name], session)
+    # несуществующие id отбрасываются выборкой из users, уже выданные - индексом
+    result = await session.execute(
+        insert(UserScopeLink)
+        .from_select(
+            ["user_id", "scope_id"],
+            select(Users.id, literal(scope_id)).where(Users.id.in_(user_ids))
         )
-        await session.commit()
-        return {"message": f"Скоуп '{scope_name}' удалён у пользователя {user_id}"}
+        .on_conflict_do_nothing(index_elements=["user_id", "scope_id"])
+    )
+    await session.commit()
+    for user_id in user_ids:
+        auth_cache.invalidate_user(user_id)
+    return {"message": f"Скоуп {scope_name} выдан", "granted": result.rowcount}
+
+
+async def revoke_scope_from_users(session: AsyncSession, scope_name: str, user_ids: list[int]):
+    [scope_id] = await scope_registry.resolve([scope_name], session)
+    revoked = list(await session.scalars(
+        delete(UserScopeLink)
+        .where(UserScopeLink.scope_id == scope_id, UserScopeLink.user_id.in_(user_ids))
+        .returning(UserScopeLink.user_id)
+    ))
+    if revoked:
+        await token_versions.bump_many(revoked, session)
+    await session.commit()
+    for user_id in revoked:
+        auth_cache.invalidate_user(user_id)
+        token_versions.invalidate(user_id)
+    return {"message": f"Скоуп {scope_name} отозван", "revoked": len(revoked)}
 
 
 async def get_user_scopes(session: AsyncSession, user_id: int) -> list[str]:
@@ -71,7 +97,3 @@ async def get_user_scopes(session: AsyncSession, user_id: int) -> list[str]:
         select(Scopes.name).join(UserScopeLink).where(UserScopeLink.user_id == user_id)
     )
     return list(result)
-
-
-
-
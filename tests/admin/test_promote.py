@@ -0,0 +1,23 @@
+from sqlalchemy import insert, select, func
+
+from src.admin.service import add_admin_to_db
+from src.admin.utils import generate_admin_promotion_token
+from src.database.models import Scopes, UserScopeLink
+from src.scopes.registry import ScopeRegistry
+from tests.conftest import create_profiles
+
+
+async def test_promoting_admin_twice_keeps_one_link(pg_sessions, monkeypatch):
+    monkeypatch.setattr("src.scopes.service.scope_registry", ScopeRegistry())
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0])
+        await session.execute(insert(Scopes).values(name="admin", description="admin"))
+        await session.commit()
+
+        token = generate_admin_promotion_token(1)
+        await add_admin_to_db(token, session)
+        response = await add_admin_to_db(token, session)
+
+        assert response["message"] == "User user1@example.com promoted to admin"
+        links = await session.scalar(select(func.count()).select_from(UserScopeLink).where(UserScopeLink.user_id == 1))
+        assert links == 1
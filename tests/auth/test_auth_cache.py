@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from src.auth.cache import AuthCache, AuthUser
+
+
+def test_entries_expire_after_ttl():
+    cache = AuthCache(max_size=10, ttl=30)
+    user = AuthUser(1, "a@example.com", True)
+    with patch("src.auth.cache.time.monotonic", return_value=100.0):
+        cache.put(user.email, user, ["profile:read"])
+    with patch("src.auth.cache.time.monotonic", return_value=129.0):
+        assert cache.get(user.email) == (user, ["profile:read"])
+    with patch("src.auth.cache.time.monotonic", return_value=131.0):
+        assert cache.get(user.email) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AuthCache(max_size=2, ttl=30)
+    users = [AuthUser(i, f"user{i}@example.com", True) for i in range(3)]
+    cache.put(users[0].email, users[0], [])
+    cache.put(users[1].email, users[1], [])
+    cache.get(users[0].email)
+    cache.put(users[2].email, users[2], [])
+
+    assert cache.get(users[1].email) is None
+    assert cache.get(users[0].email) is not None
+    assert cache.get(users[2].email) is not None
+
+
+def test_invalidate_by_user_id():
+    cache = AuthCache(max_size=10, ttl=30)
+    user = AuthUser(7, "b@example.com", True)
+    cache.put(user.email, user, ["profile:like"])
+    cache.invalidate_user(7)
+    assert cache.get(user.email) is None
+    # повторная инвалидация и неизвестный id не падают
+    cache.invalidate_user(7)
+    cache.invalidate_user(8)
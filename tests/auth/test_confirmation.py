@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from httpx import AsyncClient
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Users, EmailOutbox
+
+
+@patch("src.auth.service.email_sender.notify")
+async def test_resend_issues_new_confirmation_token(mock_notify, client: AsyncClient, test_db_session: AsyncSession):
+    email = "pending@example.com"
+    await test_db_session.execute(delete(Users).where(Users.email == email))
+    await test_db_session.execute(delete(EmailOutbox).where(EmailOutbox.recipient == email))
+    sent_at = datetime.utcnow() - timedelta(days=30)
+    # токен уже очищен фоновой задачей
+    test_db_session.add(Users(email=email, password="hashed", confirmation_sent_at=sent_at))
+    await test_db_session.commit()
+
+    response = await client.post("/auth/resend-confirmation", json={"email": email})
+
+    assert response.status_code == 200, response.text
+    user = await test_db_session.scalar(
+        select(Users).where(Users.email == email).execution_options(populate_existing=True)
+    )
+    assert user.confirmation_token is not None
+    assert user.confirmation_sent_at > sent_at
+    outbox = (await test_db_session.scalars(select(EmailOutbox).where(EmailOutbox.recipient == email))).all()
+    assert len(outbox) == 1
+    assert user.confirmation_token in outbox[0].body
+    mock_notify.assert_called_once()
+
+    # письмо не должно уйти в тестах отправителя
+    await test_db_session.execute(delete(EmailOutbox).where(EmailOutbox.recipient == email))
+    await test_db_session.commit()
+
+
+@patch("src.auth.service.email_sender.notify")
+async def test_resend_skips_confirmed_and_unknown_users(mock_notify, client: AsyncClient):
+    confirmed = await client.post("/auth/resend-confirmation", json={"email": "testuser@example.com"})
+    unknown = await client.post("/auth/resend-confirmation", json={"email": "nobody@example.com"})
+
+    # ответ одинаковый, чтобы не раскрывать наличие email
+    assert confirmed.status_code == unknown.status_code == 200
+    assert confirmed.json() == unknown.json()
+    mock_notify.assert_not_called()
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src.auth.hashing import PasswordHasher
+from src.auth.utils import hash_password
+
+
+async def test_hash_and_verify_in_pool():
+    hasher = PasswordHasher(workers=2, queue_limit=4)
+    hashed = await hasher.hash("arseniyilana611")
+    assert await hasher.verify("arseniyilana611", hashed)
+    assert not await hasher.verify("wrong-password", hashed)
+    assert hasher.stats()["completed"] == 3
+    hasher.close()
+
+
+async def test_rejects_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, queue_limit=1)
+    running = asyncio.create_task(hasher._run(time.sleep, 0.2))
+    queued = asyncio.create_task(hasher._run(time.sleep, 0.2))
+    await asyncio.sleep(0)
+    assert hasher.queue_depth == 1
+
+    with pytest.raises(HTTPException) as exc:
+        await hasher._run(time.sleep, 0.2)
+    assert exc.value.status_code == 503
+
+    await asyncio.gather(running, queued)
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.stats()["peak_queue_depth"] == 1
+    hasher.close()
+
+
+async def test_calibration_stays_within_bounds_and_keeps_configured_rounds():
+    hasher = PasswordHasher(workers=1, queue_limit=4, rounds=5)
+
+    assert await hasher.calibrate(target_ms=0.001, min_rounds=4, max_rounds=6) == 4
+    assert await hasher.calibrate(target_ms=10 ** 6, min_rounds=4, max_rounds=6) == 6
+    assert hasher.rounds == 5
+    await hasher.measure()
+    assert hasher.stats()["hashes_per_second_per_core"] > 0
+    hasher.close()
+
+
+async def test_rehash_only_raises_cost():
+    hasher = PasswordHasher(workers=1, queue_limit=4, rounds=5)
+    cheaper = await hasher._run(hash_password, "arseniyilana611", 4)
+    same = await hasher.hash("arseniyilana611")
+    stronger = await hasher._run(hash_password, "arseniyilana611", 6)
+
+    assert hasher.needs_rehash(cheaper)
+    assert not hasher.needs_rehash(same)
+    assert not hasher.needs_rehash(stronger)
+    hasher.close()
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt, JWTError
+
+from src.auth.keys import KeyRing
+
+
+def write_key(path, public_only=False):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if public_only:
+        pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    else:
+        pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    path.write_bytes(pem)
+    return key
+
+
+def test_sign_and_decode_with_key_ring(tmp_path):
+    write_key(tmp_path / "2026-01.pem")
+    write_key(tmp_path / "2026-02.pem")
+    write_key(tmp_path / "2025-12.pem", public_only=True)
+    ring = KeyRing(str(tmp_path), None, "secret", "HS256")
+
+    assert ring.active_kid == "2026-02"
+    token = ring.sign({"sub": "user@example.com"})
+    assert jwt.get_unverified_header(token)["kid"] == "2026-02"
+    assert ring.decode(token)["sub"] == "user@example.com"
+    assert {key["kid"] for key in ring.jwks()["keys"]} == {"2025-12", "2026-01", "2026-02"}
+    assert all("d" not in key for key in ring.jwks()["keys"])
+
+
+def test_rejects_unknown_kid_and_foreign_signature(tmp_path):
+    write_key(tmp_path / "main.pem")
+    ring = KeyRing(str(tmp_path), "main", "secret", "HS256")
+
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    write_key(other_dir / "main.pem")
+    write_key(other_dir / "unknown.pem")
+    forged = KeyRing(str(other_dir), "main", "secret", "HS256").sign({"sub": "user@example.com"})
+    unknown = KeyRing(str(other_dir), "unknown", "secret", "HS256").sign({"sub": "user@example.com"})
+
+    with pytest.raises(JWTError):
+        ring.decode(forged)
+    with pytest.raises(JWTError):
+        ring.decode(unknown)
+
+
+def test_tokens_without_kid_use_shared_secret(tmp_path):
+    write_key(tmp_path / "main.pem")
+    ring = KeyRing(str(tmp_path), "main", "secret", "HS256", datetime.utcnow() + timedelta(hours=1))
+    legacy = jwt.encode({"sub": "user@example.com"}, "secret", algorithm="HS256")
+    assert ring.decode(legacy)["sub"] == "user@example.com"
+
+    no_keys = KeyRing(None, None, "secret", "HS256")
+    assert no_keys.decode(no_keys.sign({"sub": "a"}))["sub"] == "a"
+    assert no_keys.jwks() == {"keys": []}
+
+
+def test_tokens_without_kid_are_rejected_once_keys_are_configured(tmp_path):
+    write_key(tmp_path / "main.pem")
+    legacy = jwt.encode({"sub": "user@example.com"}, "secret", algorithm="HS256")
+
+    with pytest.raises(JWTError):
+        KeyRing(str(tmp_path), "main", "secret", "HS256").decode(legacy)
+    expired = KeyRing(str(tmp_path), "main", "secret", "HS256", datetime.utcnow() - timedelta(minutes=1))
+    with pytest.raises(JWTError):
+        expired.decode(legacy)
+
+
+def test_public_keys_without_signing_key_fail_at_startup(tmp_path):
+    write_key(tmp_path / "retired.pem", public_only=True)
+    with pytest.raises(ValueError):
+        KeyRing(str(tmp_path), None, "secret", "HS256")
+
+
+def test_timezone_aware_legacy_deadline(tmp_path):
+    write_key(tmp_path / "main.pem")
+    legacy = jwt.encode({"sub": "user@example.com"}, "secret", algorithm="HS256")
+    minsk = timezone(timedelta(hours=3))
+
+    open_ring = KeyRing(str(tmp_path), "main", "secret", "HS256", datetime.now(minsk) + timedelta(minutes=30))
+    assert open_ring.decode(legacy)["sub"] == "user@example.com"
+    # 30 минут назад в UTC+3, хотя по наивному времени это было бы в будущем
+    closed_ring = KeyRing(str(tmp_path), "main", "secret", "HS256", datetime.now(minsk) - timedelta(minutes=30))
+    with pytest.raises(JWTError):
+        closed_ring.decode(legacy)
@@ -8,7 +8,7 @@ from sqlalchemy import select, delete, text
 from sqlalchemy.exc import IntegrityError
 
 
-@patch("src.auth.service.send_confirmation_email", new_callable=AsyncMock)
+@patch("src.auth.service.enqueue_confirmation_email")
 @patch("src.auth.service.create_access_token", return_value="mocked_token")
 @patch("src.auth.service.assign_scopes_to_user", new_callable=AsyncMock)
 @patch("src.auth.service.get_user_scopes", return_value=["user:read"])
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest_asyncio
+from sqlalchemy import select, delete
+
+from src.auth.sessions import SessionStore
+from src.database.models import RefreshTokens
+
+
+@pytest_asyncio.fixture()
+async def store(test_db_session):
+    await test_db_session.execute(delete(RefreshTokens))
+    await test_db_session.commit()
+    return SessionStore(limit=3, keep_on_overflow=2)
+
+
+async def add_sessions(session, user_id: int, count: int) -> list[str]:
+    # сессии создаются с разным сроком, самая поздняя - последняя
+    tokens = []
+    for i in range(count):
+        token = RefreshTokens(user_id=user_id, expires_at=datetime(2026, 1, 1) + timedelta(days=i))
+        session.add(token)
+        tokens.append(token)
+    await session.commit()
+    return [token.token for token in tokens]
+
+
+async def user_tokens(session, user_id: int) -> set[str]:
+    return set(await session.scalars(select(RefreshTokens.token).where(RefreshTokens.user_id == user_id)))
+
+
+async def test_is_over_limit(store, test_db_session):
+    await add_sessions(test_db_session, 1, 3)
+    assert not await store.is_over_limit(1, test_db_session)
+
+    await add_sessions(test_db_session, 1, 1)
+    assert await store.is_over_limit(1, test_db_session)
+    assert await store.count(1, test_db_session) == 4
+
+
+async def test_evict_oldest_keeps_newest_sessions(store, test_db_session):
+    tokens = await add_sessions(test_db_session, 1, 5)
+    other = await add_sessions(test_db_session, 2, 2)
+
+    await store.evict_oldest(1, test_db_session)
+    await test_db_session.commit()
+
+    assert await user_tokens(test_db_session, 1) == set(tokens[-2:])
+    assert await user_tokens(test_db_session, 2) == set(other)
+
+
+async def test_revoke_single_session(store, test_db_session):
+    tokens = await add_sessions(test_db_session, 1, 2)
+
+    assert await store.revoke(tokens[0], test_db_session)
+    assert not await store.revoke(tokens[0], test_db_session)
+    await test_db_session.commit()
+
+    assert await user_tokens(test_db_session, 1) == {tokens[1]}
+
+
+async def test_revoke_all_only_touches_one_user(store, test_db_session):
+    await add_sessions(test_db_session, 1, 3)
+    other = await add_sessions(test_db_session, 2, 1)
+
+    await store.revoke_all(1, test_db_session)
+    await test_db_session.commit()
+
+    assert await user_tokens(test_db_session, 1) == set()
+    assert await user_tokens(test_db_session, 2) == set(other)
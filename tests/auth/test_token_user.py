@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, insert
+
+from src.auth.cache import AuthCache
+from src.auth.keys import key_ring
+from src.auth.service import get_token_user, get_current_user
+from src.auth.utils import create_access_token
+from src.auth.versions import TokenVersions
+from src.database.models import Users, Scopes
+from src.profiles.service import add_user_profile_to_db
+from src.scopes.registry import ScopeRegistry
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr("src.auth.service.token_versions", TokenVersions(100, 60))
+    monkeypatch.setattr("src.auth.service.auth_cache", AuthCache(100, 60))
+
+
+async def current_user(session) -> Users:
+    return await session.scalar(select(Users).where(Users.email == "testuser@example.com"))
+
+
+async def test_token_with_current_version_uses_token_scopes(test_db_session):
+    user = await current_user(test_db_session)
+    token = create_access_token(
+        {"sub": user.email, "uid": user.id}, ["profile:like"], version=user.token_version
+    )
+
+    user_data = await get_token_user(test_db_session, token)
+
+    assert user_data["user"].id == user.id
+    assert user_data["scopes"] == ["profile:like"]
+
+
+async def test_token_with_old_version_is_rejected(test_db_session):
+    user = await current_user(test_db_session)
+    token = create_access_token(
+        {"sub": user.email, "uid": user.id}, ["profile:like"], version=user.token_version - 1
+    )
+
+    with pytest.raises(HTTPException) as exc:
+        await get_token_user(test_db_session, token)
+    assert exc.value.status_code == 401
+    assert exc.value.detail == "Токен отозван"
+
+
+async def test_current_user_rejects_revoked_token(test_db_session):
+    user = await current_user(test_db_session)
+    current = create_access_token({"sub": user.email, "uid": user.id}, [], version=user.token_version)
+    revoked = create_access_token({"sub": user.email, "uid": user.id}, [], version=user.token_version - 1)
+
+    assert (await get_current_user(test_db_session, current))["user"].id == user.id
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(test_db_session, revoked)
+    assert exc.value.status_code == 401
+
+
+async def test_token_without_version_is_checked_against_database(test_db_session):
+    user = await current_user(test_db_session)
+    # токен до появления версий: ни uid, ни ver, скоупы из него не используются
+    token = key_ring.sign({
+        "sub": user.email,
+        "scopes": ["admin:all"],
+        "exp": datetime.utcnow() + timedelta(minutes=5)
+    })
+
+    user_data = await get_token_user(test_db_session, token)
+
+    assert user_data["user"].id == user.id
+    assert "admin:all" not in user_data["scopes"]
+
+
+async def test_profile_creation_returns_token_with_profile_scopes(pg_sessions, monkeypatch):
+    monkeypatch.setattr("src.scopes.service.scope_registry", ScopeRegistry())
+    async with pg_sessions() as session:
+        await session.execute(insert(Users).values(email="new@example.com", password="hashed", is_confirmed=True))
+        await session.execute(insert(Scopes), [
+            {"name": name, "description": name}
+            for name in ["profile:edit", "profile:like", "profile:view", "profile:dislike"]
+        ])
+        await session.commit()
+        user_id = await session.scalar(select(Users.id).where(Users.email == "new@example.com"))
+        data = SimpleNamespace(
+            name="name", gender="male", orientation="other", birthday=datetime(2000, 1, 1),
+            country="BY", region="region", city="city", bio="bio"
+        )
+
+        result = await add_user_profile_to_db(
+            data, session, user_id, {"photo_url": None, "photo_public_id": None}
+        )
+        user_data = await get_token_user(session, result["access_token"])
+
+    assert sorted(user_data["scopes"]) == ["profile:dislike", "profile:edit", "profile:like", "profile:view"]
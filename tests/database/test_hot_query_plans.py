@@ -0,0 +1,160 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, text
+
+from src.auth.cache import AuthCache
+from src.auth.schemas import ResetPasswordRequest
+from src.auth.service import get_current_user, confirm_user_email, refresh_access_token_in_db, \
+    reset_password_in_db, logout_user_from_db
+from src.auth.sessions import session_store
+from src.auth.utils import create_access_token
+from src.auth.versions import TokenVersions
+from src.maintenance.service import expired_refresh_tokens_batch, stale_confirmation_tokens_batch, \
+    expired_reset_tokens_batch
+from src.profiles import service
+from src.profiles.service import like_user_profile_in_db, dislike_user_profile_in_db, get_next_profile, \
+    get_next_profiles, get_liked_me_profiles, get_matches, change_user_profile_in_db, validate_user_geo
+from src.scopes.registry import ScopeRegistry
+from src.scopes.service import get_user_scopes, grant_scope_to_users, revoke_scope_from_users
+
+
+SEED_SQL = [
+    """INSERT INTO users (id, email, password, is_confirmed, confirmation_token,
+                          password_reset_confirmation_token, password_reset_confirmation_token_expires)
+       SELECT i, 'user' || i || '@example.com', 'hashed', true, md5(i::text), md5('reset' || i),
+              now() + interval '1 hour'
+       FROM generate_series(1, 5000) AS i""",
+    """INSERT INTO profiles (user_id, name, gender, orientation, birthday, last_active_at, country, region, city,
+                             bio, test_score)
+       SELECT i, 'name' || i, 'male', 'other', '2000-01-01', now(), 'BY', 'region', 'city', 'bio', random() * 10
+       FROM generate_series(1, 5000) AS i""",
+    """INSERT INTO likes (from_user_id, to_user_id)
+       SELECT i, (i + j * 7) % 5000 + 1 FROM generate_series(1, 5000) AS i, generate_series(1, 5) AS j""",
+    """INSERT INTO dislikes (from_user_id, to_user_id)
+       SELECT i, (i + j * 11) % 5000 + 1 FROM generate_series(1, 5000) AS i, generate_series(1, 5) AS j""",
+    """INSERT INTO prfoile_view_histories (viewed_user_id, viewing_user_id, action, timestamp)
+       SELECT (i + j * 7) % 5000 + 1, i, 'like', now()
+       FROM generate_series(1, 5000) AS i, generate_series(1, 10) AS j""",
+    """INSERT INTO matches (liking_user_id, liked_user_id)
+       SELECT i, (i + 13) % 5000 + 1 FROM generate_series(1, 5000) AS i""",
+    """INSERT INTO match_summaries (user_id, match_id, partner_user_id, partner_name)
+       SELECT m.liking_user_id, m.id, m.liked_user_id, 'name' FROM matches m
+       UNION ALL
+       SELECT m.liked_user_id, m.id, m.liking_user_id, 'name' FROM matches m""",
+    """INSERT INTO refresh_tokens (token, user_id, expires_at, created_at)
+       SELECT md5('token' || i || '-' || j), i, now() + j * interval '1 day', now()
+       FROM generate_series(1, 5000) AS i, generate_series(1, 3) AS j""",
+    """INSERT INTO scopes (id, name, description)
+       SELECT i, 'scope:' || i, 'description' FROM generate_series(1, 10) AS i""",
+    """INSERT INTO user_scope_links (user_id, scope_id)
+       SELECT i, j FROM generate_series(1, 5000) AS i, generate_series(1, 2) AS j""",
+    """INSERT INTO countries (code, name_en, name_ru) VALUES ('BY', 'Belarus', 'Беларусь')""",
+    """INSERT INTO regions (id, name_en, name_ru, country_code)
+       SELECT i, 'region' || i, 'регион' || i, 'BY' FROM generate_series(1, 6) AS i""",
+    """INSERT INTO cities (name_en, name_ru, region_id)
+       SELECT 'city' || i, 'город' || i, i % 6 + 1 FROM generate_series(1, 3000) AS i""",
+]
+
+
+
+def md5(value: str) -> str:
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def user(user_id: int):
+    return SimpleNamespace(id=user_id)
+
+
+def profile_form(**changes):
+    fields = ["name", "gender", "orientation", "birthday", "country", "region", "city", "bio", "photo"]
+    return SimpleNamespace(**{field: changes.get(field) for field in fields})
+
+
+# Горячие пути сервиса. Их запросы перехватываются и проверяются через EXPLAIN
+# ровно в том виде, в каком сервис отправляет их в базу
+HOT_PATHS = {
+    "next_profile": lambda session: get_next_profile(user(42), session),
+    "next_profiles": lambda session: get_next_profiles(user(42), session, 20),
+    "like": lambda session: like_user_profile_in_db(43, session, user(42)),
+    "like_with_match": lambda session: like_user_profile_in_db(42, session, user(50)),
+    "dislike": lambda session: dislike_user_profile_in_db(44, session, user(42)),
+    "score_flush": lambda session: service.score_writer.flush(),
+    "liked_me": lambda session: get_liked_me_profiles(user(42), session, 20, None),
+    "matches": lambda session: get_matches(user(42), session, 20, None),
+    "profile_edit": lambda session: change_user_profile_in_db(profile_form(name="renamed"), session, user(42), None),
+    "geo": lambda session: validate_user_geo(
+        SimpleNamespace(country="BY", region="регион1", city="город6"), session
+    ),
+    "current_user": lambda session: get_current_user(
+        session, create_access_token({"sub": "user42@example.com", "uid": 42}, [], version=0)
+    ),
+    "user_scopes": lambda session: get_user_scopes(session, 42),
+    "grant_scope": lambda session: grant_scope_to_users(session, "scope:3", [42, 43]),
+    "revoke_scope": lambda session: revoke_scope_from_users(session, "scope:3", [42, 43]),
+    "confirm_email": lambda session: confirm_user_email(md5("42"), session),
+    "refresh": lambda session: refresh_access_token_in_db(md5("token42-1"), session),
+    "logout": lambda session: logout_user_from_db(md5("token42-2"), session),
+    "session_limit": lambda session: session_store.is_over_limit(43, session),
+    "evict_sessions": lambda session: session_store.evict_oldest(43, session),
+    "reset_password": lambda session: reset_password_in_db(
+        ResetPasswordRequest(token=md5("reset44"), new_password="arseniyilana611"), session
+    ),
+    "expired_sessions_batch": lambda session: session.execute(expired_refresh_tokens_batch(1000)),
+    "stale_confirmations_batch": lambda session: session.execute(stale_confirmation_tokens_batch(1000)),
+    "expired_resets_batch": lambda session: session.execute(expired_reset_tokens_batch(1000)),
+}
+
+
+# чтение таблицы целиком по замыслу: реестр скоупов загружается раз на процесс
+FULL_TABLE_READS = {
+    "SELECT scopes.name, scopes.id \nFROM scopes",
+}
+
+
+@pytest.fixture()
+def auth_state(monkeypatch):
+    monkeypatch.setattr("src.auth.service.auth_cache", AuthCache(100, 60))
+    monkeypatch.setattr("src.auth.service.token_versions", TokenVersions(100, 60))
+    monkeypatch.setattr("src.scopes.service.token_versions", TokenVersions(100, 60))
+    monkeypatch.setattr("src.scopes.service.scope_registry", ScopeRegistry())
+
+
+async def test_hot_queries_do_not_fall_back_to_seq_scan(pg_engine, pg_sessions, swipe_state, auth_state):
+    async with pg_engine.connect() as conn:
+        for statement in SEED_SQL:
+            await conn.execute(text(statement))
+        await conn.commit()
+        await conn.execute(text("ANALYZE"))
+        await conn.commit()
+
+    captured = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+            captured.setdefault(statement, (current_path, parameters))
+
+    current_path = None
+    event.listen(pg_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        for current_path, hot_path in HOT_PATHS.items():
+            async with pg_sessions() as session:
+                await hot_path(session)
+                await session.commit()
+    finally:
+        event.remove(pg_engine.sync_engine, "before_cursor_execute", capture)
+
+    seq_scans = {}
+    async with pg_engine.connect() as conn:
+        # Без seq scan планировщик выберет индекс, если хоть один подходит;
+        # Seq Scan в плане значит, что индекса для запроса нет
+        await conn.execute(text("SET enable_seqscan = off"))
+        for statement, (path, parameters) in captured.items():
+            plan = "\n".join((await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)).scalars())
+            if "Seq Scan" in plan and statement not in FULL_TABLE_READS:
+                seq_scans[f"{path}: {statement}"] = plan
+        await conn.rollback()
+
+    assert len(captured) > len(HOT_PATHS)
+    assert not seq_scans, seq_scans
@@ -0,0 +1,124 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+from fastapi_mail import ConnectionConfig
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import EmailOutbox
+from src.mail.sender import EmailSender
+from src.mail.service import enqueue_email
+from tests.conftest import TestSessionLocal
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def local_config(port: int) -> ConnectionConfig:
+    return ConnectionConfig(
+        MAIL_USERNAME="",
+        MAIL_PASSWORD="",
+        MAIL_FROM="cupidon@example.com",
+        MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False,
+        VALIDATE_CERTS=False
+    )
+
+
+def make_sender(port: int) -> EmailSender:
+    return EmailSender(
+        TestSessionLocal,
+        lambda: local_config(port),
+        pool_size=1,
+        batch_size=10,
+        poll_interval=1,
+        max_attempts=2,
+        retry_base=60
+    )
+
+
+@pytest.fixture()
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+async def test_outbox_is_sent_over_pooled_connection(smtp_server, test_db_session: AsyncSession):
+    controller, handler = smtp_server
+    for i in range(3):
+        enqueue_email(test_db_session, f"outbox{i}@example.com", "Тема", "<p>Письмо</p>")
+    await test_db_session.commit()
+
+    sender = make_sender(controller.port)
+    assert await sender.send_pending() == 3
+    await sender.close()
+
+    assert sorted(envelope.rcpt_tos[0] for envelope in handler.envelopes) == [
+        "outbox0@example.com", "outbox1@example.com", "outbox2@example.com"
+    ]
+    emails = (await test_db_session.scalars(
+        select(EmailOutbox).where(EmailOutbox.recipient.like("outbox%"))
+    )).all()
+    for email in emails:
+        await test_db_session.refresh(email)
+    assert {email.status for email in emails} == {"sent"}
+    assert sender.stats()["sent"] == 3
+
+
+async def test_failed_delivery_is_retried_then_given_up(test_db_session: AsyncSession):
+    email = enqueue_email(test_db_session, "retry@example.com", "Тема", "<p>Письмо</p>")
+    await test_db_session.commit()
+
+    # на этом порту никто не слушает
+    sender = make_sender(free_port())
+    assert await sender.send_pending() == 1
+    await test_db_session.refresh(email)
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert email.next_attempt_at > datetime.utcnow()
+
+    # до следующей попытки письмо не берется
+    assert await sender.send_pending() == 0
+
+    email.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    await test_db_session.commit()
+    assert await sender.send_pending() == 1
+    await test_db_session.refresh(email)
+    assert email.status == "failed"
+    assert sender.stats()["failed"] == 1
+    await sender.close()
+
+
+async def test_dead_server_with_more_emails_than_connections(test_db_session: AsyncSession):
+    emails = [enqueue_email(test_db_session, f"dead{i}@example.com", "Тема", "<p>Письмо</p>") for i in range(3)]
+    await test_db_session.commit()
+
+    # пул на одно соединение: каждая неудачная попытка освобождает слот для следующего письма
+    sender = make_sender(free_port())
+    assert await asyncio.wait_for(sender.send_pending(), timeout=10) == 3
+    for email in emails:
+        await test_db_session.refresh(email)
+    assert {(email.status, email.attempts) for email in emails} == {("pending", 1)}
+    assert sender.stats()["pool_connections"] == 0
+    await sender.close()
@@ -0,0 +1,105 @@
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, func
+
+from src.database.models import RefreshTokens, Users
+from src.maintenance.scheduler import MaintenanceScheduler
+from src.maintenance.service import expired_refresh_tokens_batch, stale_confirmation_tokens_batch, \
+    expired_reset_tokens_batch
+
+
+def scheduler(pg_engine, monkeypatch, batch_size: int) -> MaintenanceScheduler:
+    monkeypatch.setattr("src.maintenance.scheduler.engine", pg_engine)
+    return MaintenanceScheduler(interval=3600, batch_size=batch_size, batch_pause=0)
+
+
+async def add_users(session, rows: list[dict]):
+    await session.execute(insert(Users), [
+        {"email": f"user{i}@example.com", "password": "hashed", **row} for i, row in enumerate(rows)
+    ])
+    await session.commit()
+
+
+async def test_expired_refresh_tokens_are_purged_in_batches(pg_engine, pg_sessions, monkeypatch):
+    now = datetime.utcnow()
+    async with pg_sessions() as session:
+        await add_users(session, [{}])
+        user_id = await session.scalar(select(Users.id))
+        await session.execute(insert(RefreshTokens), [
+            {"token": f"expired{i}", "user_id": user_id, "expires_at": now - timedelta(days=1)} for i in range(5)
+        ] + [{"token": "live", "user_id": user_id, "expires_at": now + timedelta(days=1)}])
+        await session.commit()
+
+    batches = []
+
+    def counted_batch(batch_size: int):
+        batches.append(batch_size)
+        return expired_refresh_tokens_batch(batch_size)
+
+    jobs = scheduler(pg_engine, monkeypatch, batch_size=2)
+    jobs.add_job("expired_refresh_tokens", counted_batch)
+
+    # пачки по 2 строки: 2 + 2 + 1, неполная пачка завершает проход
+    assert await jobs.run_job("expired_refresh_tokens") == 5
+    assert batches == [2, 2, 2]
+    async with pg_sessions() as session:
+        assert list(await session.scalars(select(RefreshTokens.token))) == ["live"]
+
+    assert await jobs.run_job("expired_refresh_tokens") == 0
+    stats = jobs.stats()["expired_refresh_tokens"]
+    assert (stats["runs"], stats["last_purged"], stats["total_purged"]) == (2, 0, 5)
+
+
+async def test_stale_confirmation_tokens_are_cleared(pg_engine, pg_sessions, monkeypatch):
+    now = datetime.utcnow()
+    async with pg_sessions() as session:
+        await add_users(session, [
+            {"confirmation_token": "stale", "confirmation_sent_at": now - timedelta(days=30)},
+            # повторная отправка обновила срок, хотя аккаунт старый
+            {"confirmation_token": "resent", "confirmation_sent_at": now - timedelta(hours=1),
+             "created_at": now - timedelta(days=30)},
+            {"confirmation_token": "confirmed", "confirmation_sent_at": now - timedelta(days=30),
+             "is_confirmed": True},
+        ])
+
+    jobs = scheduler(pg_engine, monkeypatch, batch_size=10)
+    jobs.add_job("stale_confirmation_tokens", stale_confirmation_tokens_batch)
+
+    assert await jobs.run_job("stale_confirmation_tokens") == 1
+    async with pg_sessions() as session:
+        tokens = await session.scalars(select(Users.confirmation_token).order_by(Users.id))
+        assert list(tokens) == [None, "resent", "confirmed"]
+
+
+async def test_expired_reset_tokens_are_cleared(pg_engine, pg_sessions, monkeypatch):
+    now = datetime.utcnow()
+    async with pg_sessions() as session:
+        await add_users(session, [
+            {"password_reset_confirmation_token": "expired",
+             "password_reset_confirmation_token_expires": now - timedelta(minutes=1)},
+            {"password_reset_confirmation_token": "live",
+             "password_reset_confirmation_token_expires": now + timedelta(hours=1)},
+        ])
+
+    jobs = scheduler(pg_engine, monkeypatch, batch_size=10)
+    jobs.add_job("expired_reset_tokens", expired_reset_tokens_batch)
+
+    assert await jobs.run_job("expired_reset_tokens") == 1
+    async with pg_sessions() as session:
+        tokens = await session.scalars(select(Users.password_reset_confirmation_token).order_by(Users.id))
+        assert list(tokens) == [None, "live"]
+
+
+async def test_job_is_skipped_while_another_process_holds_the_lock(pg_engine, monkeypatch):
+    jobs = scheduler(pg_engine, monkeypatch, batch_size=10)
+    jobs.add_job("expired_refresh_tokens", expired_refresh_tokens_batch)
+    lock_key = zlib.crc32(b"maintenance:expired_refresh_tokens")
+
+    async with pg_engine.connect() as other:
+        assert await other.scalar(select(func.pg_try_advisory_lock(lock_key)))
+        assert await jobs.run_job("expired_refresh_tokens") is None
+        await other.scalar(select(func.pg_advisory_unlock(lock_key)))
+
+    assert jobs.stats()["expired_refresh_tokens"]["skipped_locked"] == 1
+    assert await jobs.run_job("expired_refresh_tokens") == 0
@@ -0,0 +1,59 @@
+import numpy as np
+from tensorflow import keras
+
+from src.moderation.backends import CATEGORIES, KerasBackend, TFLiteBackend
+from src.moderation.export import export_int8, parity_ok, parity_report, export_checked, split_samples
+
+
+def small_model():
+    keras.utils.set_random_seed(0)
+    return keras.Sequential([
+        keras.Input((16, 16, 3)),
+        keras.layers.Conv2D(4, 3, activation="relu"),
+        keras.layers.GlobalAveragePooling2D(),
+        keras.layers.Dense(len(CATEGORIES), activation="softmax")
+    ])
+
+
+def test_int8_export_keeps_parity_with_keras_model(tmp_path):
+    model = small_model()
+    images = np.random.default_rng(0).random((24, 16, 16, 3), dtype=np.float32)
+    output_path = str(tmp_path / "model.tflite")
+    export_int8(model, images[:16], output_path)
+
+    reference = KerasBackend(model)
+    candidate = TFLiteBackend(output_path)
+    labels = [max(scores, key=scores.get) for scores in reference.predict(images)]
+    report = parity_report(reference, candidate, images, labels, batch_size=5)
+
+    assert candidate.input_size == reference.input_size == (16, 16)
+    assert report["samples"] == 24
+    assert report["max_score_diff"] < 0.05
+    assert parity_ok(report, min_agreement=0.95, max_accuracy_drop=0.1)
+
+
+def test_calibration_images_are_held_out():
+    calibration, evaluation = split_samples(30, 10)
+    assert len(calibration) == 10 and len(evaluation) == 20
+    assert sorted(np.concatenate([calibration, evaluation])) == list(range(30))
+
+
+def test_model_is_replaced_only_when_parity_passes(tmp_path):
+    reference = KerasBackend(small_model())
+    images = np.random.default_rng(0).random((24, 16, 16, 3), dtype=np.float32)
+    labels = [max(scores, key=scores.get) for scores in reference.predict(images)]
+    output_path = tmp_path / "model.tflite"
+    output_path.write_bytes(b"current model")
+
+    report, ok = export_checked(reference, images, labels, str(output_path), 16,
+                                min_agreement=1.01, max_accuracy_drop=0.1)
+    assert not ok
+    assert report["samples"] == 8
+    assert output_path.read_bytes() == b"current model"
+    assert [path.name for path in tmp_path.iterdir()] == ["model.tflite"]
+
+    _, ok = export_checked(reference, images, labels, str(output_path), 16,
+                           min_agreement=0.5, max_accuracy_drop=1.0)
+    assert ok
+    assert TFLiteBackend(str(output_path)).input_size == (16, 16)
+    assert [path.name for path in tmp_path.iterdir()] == ["model.tflite"]
@@ -0,0 +1,61 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from src.moderation.cache import VerdictCache
+from src.moderation.images import decode_image_with_hashes
+
+SAFE_SCORES = {"drawings": 0.1, "hentai": 0.0, "neutral": 0.9, "porn": 0.0, "sexy": 0.0}
+UNSAFE_SCORES = {"drawings": 0.0, "hentai": 0.0, "neutral": 0.1, "porn": 0.9, "sexy": 0.0}
+
+
+def photo(seed: int) -> Image.Image:
+    pixels = np.random.default_rng(seed).integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    return Image.fromarray(pixels).resize((256, 256), Image.BICUBIC)
+
+
+def encode(image: Image.Image, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def hashes(data: bytes) -> tuple[int, bytes]:
+    _, image_hash, digest = decode_image_with_hashes(data, (32, 32))
+    return image_hash, digest
+
+
+def test_verdict_is_reused_only_for_identical_pixels():
+    cache = VerdictCache(max_size=10, radius=3)
+    original = photo(1)
+    cache.put(hashes(encode(original, format="PNG"))[1], SAFE_SCORES)
+
+    # тот же снимок в другом контейнере без потерь - те же пиксели
+    assert cache.get(hashes(encode(original, format="BMP"))[1]) == SAFE_SCORES
+    reupload = encode(original.resize((180, 180)), format="JPEG", quality=60)
+    assert cache.get(hashes(reupload)[1]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_near_duplicate_of_rejected_photo_is_found():
+    cache = VerdictCache(max_size=10, radius=3)
+    original = photo(1)
+    cache.put_unsafe(hashes(encode(original, format="PNG"))[0], UNSAFE_SCORES)
+
+    reupload = encode(original.resize((180, 180)), format="JPEG", quality=60)
+    assert cache.find_unsafe(hashes(reupload)[0]) == UNSAFE_SCORES
+    assert cache.find_unsafe(hashes(encode(photo(2), format="PNG"))[0]) is None
+    assert cache.stats()["unsafe_hits"] == 1
+
+
+def test_least_recently_used_hash_is_evicted_from_index():
+    cache = VerdictCache(max_size=2, radius=3)
+    cache.put_unsafe(0x1111, UNSAFE_SCORES)
+    cache.put_unsafe(0x2222, UNSAFE_SCORES)
+    cache.find_unsafe(0x1111)
+    cache.put_unsafe(0x3333, UNSAFE_SCORES)
+
+    assert cache.find_unsafe(0x2222) is None
+    assert cache.find_unsafe(0x1113) == UNSAFE_SCORES
+    assert all(0x2222 not in bucket for index in cache._index for bucket in index.values())
@@ -0,0 +1,42 @@
+import io
+
+import numpy as np
+from PIL import Image
+from tensorflow import keras
+
+from src.moderation.images import decode_image
+
+
+def test_in_memory_decoding_matches_keras_loader(tmp_path):
+    pixels = np.random.default_rng(0).integers(0, 256, (37, 53, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    path = tmp_path / "photo.png"
+    path.write_bytes(buffer.getvalue())
+
+    expected = keras.preprocessing.image.img_to_array(
+        keras.preprocessing.image.load_img(str(path), target_size=(24, 24))
+    ) / 255
+
+    assert np.allclose(decode_image(memoryview(buffer.getvalue()), (24, 24)), expected)
+    buffer.seek(0)
+    assert np.allclose(decode_image(buffer, (24, 24)), expected)
+    assert decode_image(b"not an image", (24, 24)) is None
+
+
+def png_bytes(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_oversized_images_are_rejected_before_decoding(monkeypatch):
+    monkeypatch.setattr("src.moderation.images.MAX_PIXELS", 100 * 100)
+    assert decode_image(png_bytes(100, 100), (24, 24)) is not None
+    assert decode_image(png_bytes(101, 100), (24, 24)) is None
+
+
+def test_decompression_bomb_is_rejected(monkeypatch):
+    # порог PIL ниже нашего: Image.open сам отказывается открывать файл
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 50 * 50)
+    assert decode_image(png_bytes(200, 200), (24, 24)) is None
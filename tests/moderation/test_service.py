@@ -0,0 +1,143 @@
+import asyncio
+import io
+import time
+import numpy as np
+import pytest
+from PIL import Image
+from fastapi import HTTPException
+
+from src.moderation.cache import hamming
+from src.moderation.images import decode_image_with_hashes
+from src.moderation.service import ModerationService
+
+SAFE_SCORES = {"drawings": 0.1, "hentai": 0.0, "neutral": 0.9, "porn": 0.0, "sexy": 0.0}
+UNSAFE_SCORES = {"drawings": 0.0, "hentai": 0.0, "neutral": 0.1, "porn": 0.9, "sexy": 0.0}
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), (200, 10, 10)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class SlowBackend:
+    input_size = (32, 32)
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, images):
+        self.calls.append(len(images))
+        time.sleep(0.2)
+        return [SAFE_SCORES] * len(images)
+
+
+class ScriptedBackend:
+    input_size = (32, 32)
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def predict(self, images):
+        self.calls += len(images)
+        return [self.answers.pop(0) for _ in images]
+
+
+def photo_bytes(pixels: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_service(backend, **overrides) -> ModerationService:
+    options = dict(
+        workers=2, max_pending=8, timeout=5, max_batch=4, max_wait_ms=50, max_queue=8,
+        cache_size=100, cache_radius=3
+    )
+    options.update(overrides)
+    service = ModerationService(**options)
+    service.start(backend)
+    return service
+
+
+async def test_concurrent_uploads_share_one_forward_pass():
+    backend = SlowBackend()
+    service = make_service(backend)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    started = time.monotonic()
+    results = await asyncio.gather(*(service.classify(png_bytes()) for _ in range(3)))
+    elapsed = time.monotonic() - started
+    task.cancel()
+    await service.close()
+
+    assert results == [SAFE_SCORES] * 3
+    assert backend.calls == [3]
+    assert service.stats()["batching"]["largest_batch"] == 3
+    assert elapsed < 0.4
+    assert ticks > 10
+
+
+async def test_timeout_returns_503_and_frees_slot_after_work_finishes():
+    service = make_service(SlowBackend(), max_pending=1, timeout=0.05, max_wait_ms=0)
+    with pytest.raises(HTTPException) as exc:
+        await service.classify(png_bytes())
+    assert exc.value.status_code == 503
+    assert service._slots.locked()
+    await asyncio.sleep(0.3)
+    assert not service._slots.locked()
+    await service.close()
+
+
+async def test_known_image_skips_inference():
+    backend = SlowBackend()
+    service = make_service(backend)
+    first = await service.classify(png_bytes())
+    second = await service.classify(png_bytes())
+    await service.close()
+
+    assert first == second == SAFE_SCORES
+    assert backend.calls == [1]
+
+
+async def test_gradient_overlay_does_not_inherit_safe_verdict():
+    base = np.asarray(
+        Image.fromarray(np.random.default_rng(1).integers(0, 256, (8, 8, 3), dtype=np.uint8))
+        .resize((256, 256), Image.BICUBIC),
+        dtype=np.int16
+    )
+    # градиент по строкам не меняет разности соседних пикселей, на которых строится dHash
+    gradient = np.linspace(0, 40, 256)[:, None, None]
+    original = photo_bytes(base.astype(np.uint8))
+    overlaid = photo_bytes(np.clip(base + gradient, 0, 255).astype(np.uint8))
+    assert hamming(decode_image_with_hashes(original, (32, 32))[1],
+                   decode_image_with_hashes(overlaid, (32, 32))[1]) <= 3
+
+    backend = ScriptedBackend(SAFE_SCORES, UNSAFE_SCORES)
+    service = make_service(backend, max_wait_ms=0)
+    assert await service.classify(original) == SAFE_SCORES
+    assert await service.classify(overlaid) == UNSAFE_SCORES
+    await service.close()
+    assert backend.calls == 2
+
+
+async def test_near_duplicate_of_rejected_photo_skips_inference():
+    pixels = np.random.default_rng(2).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    backend = ScriptedBackend(UNSAFE_SCORES)
+    service = make_service(backend, max_wait_ms=0)
+    assert await service.classify(photo_bytes(pixels)) == UNSAFE_SCORES
+
+    # одна измененная точка: другой дайджест, тот же dHash
+    pixels[0, 0] ^= 1
+    assert await service.classify(photo_bytes(pixels)) == UNSAFE_SCORES
+    await service.close()
+    assert backend.calls == 1
+    assert service.stats()["cache"]["unsafe_hits"] == 1
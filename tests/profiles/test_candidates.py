@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+from src.profiles.candidates import CandidateQueues
+
+
+@asynccontextmanager
+async def fake_session():
+    yield None
+
+
+def make_queues(pools: list[list[int]], size: int = 5, low_watermark: int = 2, gate: asyncio.Event | None = None,
+                gate_from: int = 2, max_users: int = 100):
+    queues = CandidateQueues(size, low_watermark, max_users)
+    loads = []
+
+    async def load(user_id, session):
+        loads.append(user_id)
+        if gate is not None and len(loads) >= gate_from:
+            await gate.wait()
+        return pools[min(len(loads), len(pools)) - 1]
+
+    queues._load_candidates = load
+    return queues, loads
+
+
+async def test_peek_fills_empty_queue_and_discard_advances_it():
+    queues, loads = make_queues([[10, 11, 12, 13, 14, 15]], size=6)
+
+    assert await queues.peek(1, None) == 10
+    queues.discard(1, 10)
+    queues.discard(1, 12)
+    assert await queues.peek(1, None) == 11
+    assert loads == [1]
+
+
+async def test_peek_empty_pool_returns_none():
+    queues, _ = make_queues([[]])
+
+    assert await queues.peek(1, None) is None
+
+
+@patch("src.profiles.candidates.async_session", fake_session)
+async def test_low_watermark_schedules_background_refill():
+    queues, loads = make_queues([[10, 11, 12], [20, 21, 22, 23]])
+
+    assert await queues.peek(1, None) == 10
+    # в очереди 3 > 2, пополнение не нужно
+    assert 1 not in queues._refills
+    queues.discard(1, 10)
+    assert await queues.peek(1, None) == 11
+    task = queues._refills[1]
+    # повторный peek не запускает вторую задачу
+    await queues.peek(1, None)
+    assert queues._refills[1] is task
+
+    await task
+    assert loads == [1, 1]
+    assert await queues.peek(1, None) == 20
+    await queues.close()
+
+
+@patch("src.profiles.candidates.async_session", fake_session)
+async def test_discard_during_background_refill_is_not_resurrected():
+    gate = asyncio.Event()
+    queues, _ = make_queues([[10, 11], [11, 30, 31, 32]], gate=gate)
+
+    assert await queues.peek(1, None) == 10
+    task = queues._refills[1]
+    # пока пополнение ждет базу, пользователь свайпает 10 и 11
+    queues.discard(1, 10)
+    queues.discard(1, 11)
+    gate.set()
+    await task
+
+    assert await queues.peek(1, None) == 30
+    assert 1 not in queues._discarded
+    await queues.close()
+
+
+async def test_discard_during_refill_from_peek_is_not_resurrected():
+    gate = asyncio.Event()
+    queues, _ = make_queues([[10, 11, 12, 13, 14]], gate=gate, gate_from=1)
+
+    # первый запрос ждет базу в peek, второй в это время свайпает 10
+    peek = asyncio.create_task(queues.peek(1, None))
+    await asyncio.sleep(0)
+    queues.discard(1, 10)
+    gate.set()
+
+    assert await peek == 11
+    assert 1 not in queues._discarded and 1 not in queues._loading
+
+
+async def test_least_recently_used_queue_is_evicted():
+    queues, loads = make_queues([[10, 11, 12, 13, 14]], max_users=2)
+
+    await queues.peek(1, None)
+    await queues.peek(2, None)
+    await queues.peek(1, None)
+    await queues.peek(3, None)
+
+    assert list(queues._queues) == [1, 3]
+    await queues.peek(2, None)
+    assert loads == [1, 2, 3, 2]
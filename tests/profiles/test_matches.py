@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from sqlalchemy import select
+
+from src.database.models import MatchSummary
+from src.profiles.service import like_user_profile_in_db, change_user_profile_in_db, get_matches
+from tests.conftest import create_profiles
+
+
+def user(user_id: int):
+    return SimpleNamespace(id=user_id)
+
+
+def profile_form(**changes):
+    fields = ["name", "gender", "orientation", "birthday", "country", "region", "city", "bio", "photo"]
+    return SimpleNamespace(**{field: changes.get(field) for field in fields})
+
+
+async def match(sessions, first: int, second: int):
+    async with sessions() as session:
+        await like_user_profile_in_db(second, session, user(first))
+        await like_user_profile_in_db(first, session, user(second))
+
+
+async def test_match_creates_summary_for_both_users(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [4.0, 8.0])
+    await match(pg_sessions, 1, 2)
+
+    async with pg_sessions() as session:
+        summaries = (await session.scalars(select(MatchSummary).order_by(MatchSummary.user_id))).all()
+    assert [(s.user_id, s.partner_user_id, s.partner_name) for s in summaries] == [
+        (1, 2, "name2"),
+        (2, 1, "name1"),
+    ]
+    assert summaries[0].match_id == summaries[1].match_id
+
+
+async def test_profile_edit_refreshes_partner_snapshot(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [4.0, 8.0, 6.0])
+    await match(pg_sessions, 1, 2)
+    await match(pg_sessions, 3, 2)
+
+    async with pg_sessions() as session:
+        await change_user_profile_in_db(profile_form(name="renamed"), session, user(2), None)
+
+    async with pg_sessions() as session:
+        partners = (await session.execute(
+            select(MatchSummary.user_id, MatchSummary.partner_name).where(MatchSummary.partner_user_id == 2)
+        )).all()
+        own = await session.scalars(select(MatchSummary.partner_name).where(MatchSummary.user_id == 2))
+    assert sorted(partners) == [(1, "renamed"), (3, "renamed")]
+    assert sorted(own) == ["name1", "name3"]
+
+
+async def test_matches_pages_cover_all_matches(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0] * 6)
+    for partner in range(2, 7):
+        await match(pg_sessions, 1, partner)
+
+    seen, cursor = [], None
+    async with pg_sessions() as session:
+        while True:
+            page = await get_matches(user(1), session, 2, cursor)
+            seen.extend(item["user_id"] for item in page["matches"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    assert seen == [6, 5, 4, 3, 2]
@@ -0,0 +1,112 @@
+import random
+from types import SimpleNamespace
+
+from sqlalchemy import update
+
+from src.database.models import Profiles
+from src.profiles import service
+from src.profiles.score_index import ScoreIndex
+from src.profiles.service import get_next_profile, get_next_profiles
+from tests.conftest import create_profiles
+
+
+def user(user_id: int):
+    return SimpleNamespace(id=user_id)
+
+
+def brute_force_nearest(scores: dict[int, float], target: float, exclude: set[int], limit: int) -> list[int]:
+    ordered = sorted(
+        (user_id for user_id in scores if user_id not in exclude),
+        key=lambda user_id: (abs(scores[user_id] - target), user_id)
+    )
+    return ordered[:limit]
+
+
+def test_nearest_matches_order_by_distance():
+    random.seed(42)
+    index = ScoreIndex()
+    scores = {}
+    for user_id in range(1, 500):
+        # повторяющиеся оценки, чтобы проверить порядок при равной дистанции
+        scores[user_id] = random.choice([0.0, 2.5, 5.0, 7.5, 10.0, round(random.uniform(0, 10), 1)])
+        index.update(user_id, scores[user_id])
+
+    for _ in range(50):
+        target = round(random.uniform(0, 10), 1)
+        exclude = set(random.sample(sorted(scores), 100))
+        assert index.nearest(target, exclude, 20) == brute_force_nearest(scores, target, exclude, 20)
+
+
+def test_update_moves_profile_and_remove_drops_it():
+    index = ScoreIndex()
+    index.update(1, 1.0)
+    index.update(2, 5.0)
+    index.update(3, 9.0)
+
+    assert index.nearest(8.5, set(), 1) == [3]
+
+    index.update(2, 8.4)
+    assert index.nearest(8.5, set(), 1) == [2]
+    assert index.get(2) == 8.4
+
+    index.remove(2)
+    assert index.nearest(8.5, set(), 3) == [3, 1]
+    assert len(index) == 2
+
+
+def test_pages_with_after_key_cover_full_order():
+    random.seed(7)
+    index = ScoreIndex()
+    scores = {}
+    for user_id in range(1, 300):
+        scores[user_id] = random.choice([1.0, 4.5, 5.5, 9.0, round(random.uniform(0, 10), 2)])
+        index.update(user_id, scores[user_id])
+    exclude = {5, 10, 15}
+    target = 5.0
+
+    pages = []
+    after = None
+    while True:
+        page = index.nearest(target, exclude, 25, after)
+        if not page:
+            break
+        pages.extend(page)
+        after = (abs(scores[page[-1]] - target), page[-1])
+
+    assert pages == brute_force_nearest(scores, target, exclude, len(scores))
+
+
+async def set_score(sessions, user_id: int, score: float):
+    # оценку меняет другой процесс или сервис теста, мимо индекса
+    async with sessions() as session:
+        await session.execute(update(Profiles).where(Profiles.user_id == user_id).values(test_score=score))
+        await session.commit()
+
+
+async def test_score_set_after_load_is_picked_up(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0, 6.0, None])
+        assert (await get_next_profile(user(1), session))["user_id"] == 2
+
+    await set_score(pg_sessions, 3, 5.5)
+    async with pg_sessions() as session:
+        # свой профиль находится запросом к базе при промахе индекса
+        assert (await get_next_profile(user(3), session))["user_id"] in (1, 2)
+
+    await set_score(pg_sessions, 2, 9.0)
+    service.score_index.invalidate()
+    async with pg_sessions() as session:
+        feed = await get_next_profiles(user(1), session, limit=5)
+    assert [profile["user_id"] for profile in feed["profiles"]] == [3, 2]
+
+
+async def test_reload_keeps_unflushed_deltas(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0, 9.5])
+    service.score_writer.record(1, 1.5)
+    service.score_writer.record(2, 1.0)
+
+    index = ScoreIndex(reload_interval=0)
+    async with pg_sessions() as session:
+        await index.ensure_loaded(session, service.score_writer.pending())
+    assert (index.get(1), index.get(2)) == (6.5, 10)
@@ -0,0 +1,80 @@
+import asyncio
+
+from sqlalchemy import select
+
+from src.database.models import Profiles
+from src.profiles.score_writer import ScoreWriter
+from tests.conftest import create_profiles
+
+
+def failing_sessions():
+    raise ConnectionError("база недоступна")
+
+
+async def scores(sessions) -> dict[int, float]:
+    async with sessions() as session:
+        return dict((await session.execute(select(Profiles.user_id, Profiles.test_score))).all())
+
+
+def test_deltas_coalesce_per_user():
+    writer = ScoreWriter(failing_sessions, flush_interval=60, batch_size=100)
+    writer.record(1, 0.5)
+    writer.record(1, -0.2)
+    writer.record(2, 1.0)
+
+    assert len(writer) == 2
+    assert abs(writer._pending[1] - 0.3) < 1e-9
+    assert writer._pending[2] == 1.0
+
+
+async def test_failed_flush_requeues_deltas():
+    writer = ScoreWriter(failing_sessions, flush_interval=60, batch_size=100)
+    writer.record(1, 0.5)
+    await writer.flush()
+    writer.record(1, 0.25)
+
+    assert writer._pending == {1: 0.75}
+
+
+async def test_flush_adds_deltas_and_clamps(pg_sessions):
+    async with pg_sessions() as session:
+        await create_profiles(session, [9.5, 1.0, 5.0])
+    writer = ScoreWriter(pg_sessions, flush_interval=60, batch_size=2)
+    writer.record(1, 1.0)
+    writer.record(2, -3.0)
+    writer.record(3, 0.5)
+    writer.record(3, 0.5)
+    await writer.flush()
+
+    assert await scores(pg_sessions) == {1: 10.0, 2: 0.0, 3: 6.0}
+    assert len(writer) == 0
+
+
+async def test_size_threshold_wakes_writer_before_interval(pg_sessions):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0, 5.0])
+    writer = ScoreWriter(pg_sessions, flush_interval=60, batch_size=2)
+    writer.start()
+    writer.record(1, 1.0)
+    await asyncio.sleep(0.1)
+    assert len(writer) == 1
+
+    writer.record(2, -1.0)
+    for _ in range(50):
+        if not len(writer):
+            break
+        await asyncio.sleep(0.05)
+    await writer.close()
+
+    assert await scores(pg_sessions) == {1: 6.0, 2: 4.0}
+
+
+async def test_close_flushes_pending_deltas(pg_sessions):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0])
+    writer = ScoreWriter(pg_sessions, flush_interval=60, batch_size=100)
+    writer.start()
+    writer.record(1, 2.0)
+    await writer.close()
+
+    assert await scores(pg_sessions) == {1: 7.0}
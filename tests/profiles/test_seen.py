@@ -0,0 +1,108 @@
+import asyncio
+import struct
+from types import SimpleNamespace
+
+from sqlalchemy import select, insert
+
+from src.database.models import Profiles, ProfileViewHistory, Users
+from src.profiles.seen import SeenSet, SeenSetCache
+from src.profiles.service import like_user_profile_in_db, dislike_user_profile_in_db
+from tests.conftest import create_profiles
+
+
+def test_seen_set_sorts_and_dedupes_appended_ids():
+    data = b"".join(struct.pack(">I", user_id) for user_id in [7, 3, 70000, 3, 1])
+    seen = SeenSet.from_bytes(data)
+
+    assert len(seen) == 4
+    assert 3 in seen and 70000 in seen
+    assert 2 not in seen
+    assert seen.to_bytes() == b"".join(struct.pack(">I", user_id) for user_id in [1, 3, 7, 70000])
+    assert len(SeenSet.from_bytes(b"")) == 0
+
+
+async def test_cache_evicts_least_recently_used():
+    cache = SeenSetCache(max_size=2, session_factory=None)
+    cache.put(1, SeenSet.from_ids([10]))
+    cache.put(2, SeenSet.from_ids([20]))
+    await cache.get(1, None)
+    cache.put(3, SeenSet.from_ids([30]))
+
+    assert list(cache._cache) == [1, 3]
+    cache.invalidate(1)
+    assert list(cache._cache) == [3]
+
+
+def test_append_inserts_one_id_or_invalidates():
+    cache = SeenSetCache(max_size=10, session_factory=None)
+    seen = SeenSet.from_ids([3, 9])
+    cache.put(1, seen)
+
+    cache.append(1, 5, 12)
+    assert cache._cache[1] is seen
+    assert list(seen._ids) == [3, 5, 9]
+
+    # в базе на id больше, чем ожидалось: другой процесс дописал свой свайп
+    cache.append(1, 7, 20)
+    assert 1 not in cache._cache
+
+    cache.put(2, SeenSet())
+    cache.append(2, 4, None)
+    assert 2 not in cache._cache
+    cache.append(3, 4, 4)
+    assert 3 not in cache._cache
+
+
+async def test_swipe_updates_cached_set_in_place(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0] * 3)
+        seen = await swipe_state.get(1, session)
+        await like_user_profile_in_db(3, session, SimpleNamespace(id=1))
+        await dislike_user_profile_in_db(2, session, SimpleNamespace(id=1))
+
+    assert swipe_state._cache[1] is seen
+    assert list(seen._ids) == [2, 3]
+
+
+async def test_concurrent_and_stale_swipes_keep_every_seen_id(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0] * 5)
+        await swipe_state.get(1, session)
+
+    async def swipe(action, target):
+        async with pg_sessions() as session:
+            await action(target, session, SimpleNamespace(id=1))
+
+    await asyncio.gather(swipe(like_user_profile_in_db, 2), swipe(dislike_user_profile_in_db, 3))
+    # второй процесс со своим устаревшим кэшем
+    swipe_state.put(1, SeenSet())
+    await swipe(like_user_profile_in_db, 4)
+
+    async with pg_sessions() as session:
+        data = await session.scalar(select(Profiles.seen_ids).where(Profiles.user_id == 1))
+    assert SeenSet.from_bytes(data).to_bytes() == SeenSet.from_ids([2, 3, 4]).to_bytes()
+    # устаревший кэш не совпал по длине и был сброшен, массив перечитывается из базы
+    assert 1 not in swipe_state._cache
+    async with pg_sessions() as session:
+        assert {2, 3, 4} <= set((await swipe_state.get(1, session))._ids)
+
+
+async def test_missing_seen_set_is_built_without_committing_caller(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0] * 3)
+        await session.execute(insert(ProfileViewHistory), [
+            {"viewed_user_id": 3, "viewing_user_id": 1, "action": "like"},
+            {"viewed_user_id": 2, "viewing_user_id": 1, "action": "dislike"},
+        ])
+        await session.commit()
+
+    async with pg_sessions() as session:
+        session.add(Users(email="pending@example.com", password="hashed"))
+        await session.flush()
+        seen = await swipe_state.get(1, session)
+        await session.rollback()
+
+    assert 2 in seen and 3 in seen
+    async with pg_sessions() as session:
+        assert await session.scalar(select(Users).where(Users.email == "pending@example.com")) is None
+        assert await session.scalar(select(Profiles.seen_ids).where(Profiles.user_id == 1)) is not None
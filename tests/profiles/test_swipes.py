@@ -0,0 +1,170 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, event, func
+
+from src.database.models import Like, Dislike, ProfileViewHistory, Profiles, Match
+from src.profiles import service
+from src.profiles.seen import SeenSet
+from src.profiles.service import like_user_profile_in_db, dislike_user_profile_in_db
+from tests.conftest import create_profiles
+
+
+def user(user_id: int):
+    return SimpleNamespace(id=user_id)
+
+
+async def test_like_writes_history_like_and_seen_in_one_statement(pg_engine, pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [4.0, 8.0])
+        await swipe_state.get(1, session)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(pg_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with pg_sessions() as session:
+            response = await like_user_profile_in_db(2, session, user(1))
+    finally:
+        event.remove(pg_engine.sync_engine, "before_cursor_execute", record)
+
+    writes = [s for s in statements if "INSERT INTO prfoile_view_histories" in s]
+    assert len(writes) == 1
+    assert "INSERT INTO likes" in writes[0] and "UPDATE profiles" in writes[0]
+    # массив просмотренных не возвращается, только его длина
+    assert "RETURNING octet_length(profiles.seen_ids)" in writes[0]
+    assert response["new_test_score"] == 6.0
+    assert "info" not in response
+
+    async with pg_sessions() as session:
+        like = await session.scalar(select(Like))
+        history = await session.scalar(select(ProfileViewHistory))
+        seen_ids = await session.scalar(select(Profiles.seen_ids).where(Profiles.user_id == 1))
+    assert (like.from_user_id, like.to_user_id) == (1, 2)
+    assert (history.viewing_user_id, history.viewed_user_id, history.action) == (1, 2, "like")
+    assert 2 in SeenSet.from_bytes(seen_ids)
+
+
+async def test_dislike_writes_history_and_dislike(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [4.0, 8.0])
+        response = await dislike_user_profile_in_db(2, session, user(1))
+
+    assert response["status"] == 200
+    async with pg_sessions() as session:
+        dislike = await session.scalar(select(Dislike))
+        history = await session.scalar(select(ProfileViewHistory))
+        assert await session.scalar(select(Like)) is None
+    assert (dislike.from_user_id, dislike.to_user_id) == (1, 2)
+    assert history.action == "dislike"
+
+
+async def test_repeat_swipe_is_rejected_even_with_stale_cache(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [4.0, 8.0])
+        await like_user_profile_in_db(2, session, user(1))
+
+    # кэш другого процесса еще не знает про лайк, повтор ловит индекс истории
+    swipe_state.put(1, SeenSet())
+    async with pg_sessions() as session:
+        with pytest.raises(HTTPException) as exc:
+            await dislike_user_profile_in_db(2, session, user(1))
+    assert exc.value.status_code == 400
+
+    async with pg_sessions() as session:
+        with pytest.raises(HTTPException) as exc:
+            await like_user_profile_in_db(2, session, user(1))
+        assert exc.value.status_code == 400
+        assert await session.scalar(select(Dislike)) is None
+
+
+async def test_missing_profiles_return_404_and_write_nothing(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [4.0])
+        with pytest.raises(HTTPException) as exc:
+            await like_user_profile_in_db(99, session, user(1))
+        assert exc.value.status_code == 404
+        with pytest.raises(HTTPException) as exc:
+            await dislike_user_profile_in_db(1, session, user(99))
+        assert exc.value.status_code == 404
+        assert await session.scalar(select(ProfileViewHistory)) is None
+
+
+async def test_self_swipe_is_rejected(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [4.0])
+        for swipe in (like_user_profile_in_db, dislike_user_profile_in_db):
+            with pytest.raises(HTTPException) as exc:
+                await swipe(1, session, user(1))
+            assert exc.value.status_code == 400
+        assert await session.scalar(select(ProfileViewHistory)) is None
+
+
+async def test_reciprocal_like_creates_exactly_one_match(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [4.0, 8.0])
+        first = await like_user_profile_in_db(2, session, user(1))
+        second = await like_user_profile_in_db(1, session, user(2))
+
+    assert "info" not in first
+    assert second["info"] == "Произошел метч"
+    async with pg_sessions() as session:
+        matches = (await session.scalars(select(Match))).all()
+        assert await session.scalar(select(Like)) is None
+    assert [(m.liking_user_id, m.liked_user_id) for m in matches] == [(2, 1)]
+
+
+async def test_concurrent_opposite_likes_create_one_match(pg_sessions, swipe_state):
+    pairs = 6
+    async with pg_sessions() as session:
+        user_ids = await create_profiles(session, [5.0] * pairs * 2)
+        for user_id in user_ids:
+            await swipe_state.get(user_id, session)
+
+    async def like(from_user_id, to_user_id):
+        async with pg_sessions() as session:
+            return await like_user_profile_in_db(to_user_id, session, user(from_user_id))
+
+    await asyncio.gather(*(
+        like(a, b)
+        for first in range(1, pairs * 2, 2)
+        for a, b in ((first, first + 1), (first + 1, first))
+    ))
+
+    async with pg_sessions() as session:
+        matches = (await session.scalars(select(Match))).all()
+        assert await session.scalar(select(func.count()).select_from(Like)) == 0
+    pairs_matched = sorted(tuple(sorted((m.liking_user_id, m.liked_user_id))) for m in matches)
+    assert pairs_matched == [(first, first + 1) for first in range(1, pairs * 2, 2)]
+
+
+async def test_likes_within_one_flush_window_build_on_each_other(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0, 9.0, 1.0])
+        first = await like_user_profile_in_db(2, session, user(1))
+        second = await like_user_profile_in_db(3, session, user(1))
+
+    # как при последовательной записи: 5 -> 7 -> 4
+    assert (first["new_test_score"], second["new_test_score"]) == (7.0, 4.0)
+    assert service.score_index.get(1) == 4.0
+    await service.score_writer.flush()
+    async with pg_sessions() as session:
+        assert await session.scalar(select(Profiles.test_score).where(Profiles.user_id == 1)) == 4.0
+
+
+async def test_clamped_score_records_applied_delta(pg_sessions, swipe_state):
+    async with pg_sessions() as session:
+        await create_profiles(session, [9.5, 10.0, 1.0])
+        # середина двух оценок из диапазона в него и попадает, поэтому выход за 10 задаем вручную
+        service.score_index.update(2, 12.0)
+        assert (await like_user_profile_in_db(2, session, user(1)))["new_test_score"] == 10
+        assert (await like_user_profile_in_db(3, session, user(1)))["new_test_score"] == 5.5
+
+    await service.score_writer.flush()
+    async with pg_sessions() as session:
+        assert await session.scalar(select(Profiles.test_score).where(Profiles.user_id == 1)) == 5.5
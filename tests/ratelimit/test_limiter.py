@@ -0,0 +1,52 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from fastapi import HTTPException
+
+from src.config import settings
+from src.ratelimit.backends import MemoryBackend, RedisBackend
+from src.ratelimit.limiter import RateLimiter, rate_limiter
+
+
+async def test_memory_backend_rejects_over_limit():
+    limiter = RateLimiter(MemoryBackend(max_keys=100), window=60)
+    with patch("src.ratelimit.backends.time.time", return_value=600.0):
+        for _ in range(3):
+            await limiter.check("login:ip", "10.0.0.1", limit=3)
+        with pytest.raises(HTTPException) as exc:
+            await limiter.check("login:ip", "10.0.0.1", limit=3)
+        await limiter.check("login:ip", "10.0.0.2", limit=3)
+
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "60"
+    # половина предыдущего окна еще учитывается: 4 * 0.5 + 1 = 3 > 2
+    with patch("src.ratelimit.backends.time.time", return_value=690.0):
+        with pytest.raises(HTTPException):
+            await limiter.check("login:ip", "10.0.0.1", limit=2)
+
+
+async def test_redis_backend_is_shared_between_limiters():
+    server = FakeServer()
+    first = RateLimiter(RedisBackend(FakeRedis(server=server)), window=60)
+    second = RateLimiter(RedisBackend(FakeRedis(server=server)), window=60)
+
+    await first.check("login:email", "a@example.com", limit=2)
+    await second.check("login:email", "a@example.com", limit=2)
+    with pytest.raises(HTTPException):
+        await first.check("login:email", "a@example.com", limit=2)
+    await first.close()
+    await second.close()
+
+
+async def test_login_is_rejected_before_service(client, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "backend", MemoryBackend(max_keys=100))
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_EMAIL", 1)
+    form = {"username": "victim@example.com", "password": "wrong"}
+    with patch("src.auth.routers.login_user_from_db", new=AsyncMock(return_value={})) as login:
+        assert (await client.post("/auth/login", data=form)).status_code == 200
+        response = await client.post("/auth/login", data=form)
+
+    assert response.status_code == 429
+    login.assert_awaited_once()
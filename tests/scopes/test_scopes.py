@@ -0,0 +1,104 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+
+from src.auth.versions import TokenVersions
+from src.database.models import Scopes, UserScopeLink, Users
+from src.scopes.registry import ScopeRegistry
+from src.scopes.service import assign_scopes_to_user, grant_scope_to_users, revoke_scope_from_users
+from tests.conftest import create_profiles
+
+
+@pytest.fixture()
+def registry(monkeypatch):
+    registry = ScopeRegistry()
+    monkeypatch.setattr("src.scopes.service.scope_registry", registry)
+    monkeypatch.setattr("src.scopes.service.token_versions", TokenVersions(100, 60))
+    return registry
+
+
+async def add_scopes(session, names: list[str]):
+    await session.execute(insert(Scopes), [{"name": name, "description": name} for name in names])
+    await session.commit()
+
+
+async def user_scope_names(session, user_id: int) -> list[str]:
+    names = await session.scalars(
+        select(Scopes.name).join(UserScopeLink).where(UserScopeLink.user_id == user_id).order_by(Scopes.name)
+    )
+    return list(names)
+
+
+async def versions(session) -> list[int]:
+    return list(await session.scalars(select(Users.token_version).order_by(Users.id)))
+
+
+async def test_assign_is_idempotent_and_ignores_empty_list(pg_sessions, registry):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0])
+        await add_scopes(session, ["profile:like", "profile:view"])
+
+        await assign_scopes_to_user(session, ["profile:like"], 1)
+        await assign_scopes_to_user(session, ["profile:like", "profile:view"], 1)
+        await assign_scopes_to_user(session, [], 1)
+
+        assert await user_scope_names(session, 1) == ["profile:like", "profile:view"]
+
+
+async def test_grant_skips_unknown_and_already_granted_users(pg_sessions, registry):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0, 5.0, 5.0])
+        await add_scopes(session, ["admin:read"])
+        await assign_scopes_to_user(session, ["admin:read"], 1)
+
+        result = await grant_scope_to_users(session, "admin:read", [1, 2, 3, 404])
+
+        assert result["granted"] == 2
+        assert [await user_scope_names(session, user_id) for user_id in (1, 2, 3)] == [["admin:read"]] * 3
+
+
+async def test_revoke_bumps_versions_only_for_revoked_users(pg_sessions, registry):
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0, 5.0, 5.0])
+        await add_scopes(session, ["admin:read"])
+        await grant_scope_to_users(session, "admin:read", [1, 2])
+
+        result = await revoke_scope_from_users(session, "admin:read", [2, 3])
+
+        assert result["revoked"] == 1
+        assert await user_scope_names(session, 1) == ["admin:read"]
+        assert await user_scope_names(session, 2) == []
+        assert await versions(session) == [0, 1, 0]
+
+
+async def test_registry_reloads_scopes_created_elsewhere(pg_sessions, registry):
+    async with pg_sessions() as session:
+        await add_scopes(session, ["profile:like"])
+        [like_id] = await registry.resolve(["profile:like"], session)
+
+        # скоуп добавлен другим процессом: реестр перечитывает таблицу
+        await add_scopes(session, ["profile:view"])
+        ids = await registry.resolve(["profile:like", "profile:view"], session)
+        view_id = await session.scalar(select(Scopes.id).where(Scopes.name == "profile:view"))
+        assert ids == [like_id, view_id]
+
+        with pytest.raises(HTTPException) as exc:
+            await registry.resolve(["missing"], session)
+        assert exc.value.status_code == 404
+
+
+async def test_bump_many_increments_only_listed_users(pg_sessions):
+    token_versions = TokenVersions(100, 60)
+    async with pg_sessions() as session:
+        await create_profiles(session, [5.0, 5.0, 5.0])
+        assert (await token_versions.get(1, session)).version == 0
+
+        await token_versions.bump_many([1, 3], session)
+        await token_versions.bump_many([1], session)
+        await session.commit()
+        assert await versions(session) == [2, 0, 1]
+
+        # до invalidate действует закэшированная версия
+        assert (await token_versions.get(1, session)).version == 0
+        token_versions.invalidate(1)
+        assert (await token_versions.get(1, session)).version == 2